@@ -1,20 +1,30 @@
 # ComfyUI_MetaAi/__init__.py
-from .meta_ai_t2i_nodes import NODE_CLASS_MAPPINGS as t2i_mappings, NODE_DISPLAY_NAME_MAPPINGS as t2i_display_mappings
-from .meta_ai_open import MetaAiBrowserNode
-from .meta_ai_i2v_single import MetaAiSingleVideoGenerator
+# Solo se registran clases ligeras: Playwright, torch, cv2, etc. se importan
+# en la primera ejecución de cada nodo (ver meta_ai_shells.py).
+from .meta_ai_shells import (
+    MetaAiImageGeneratorShell, MetaAiBrowserNodeShell, MetaAiSingleVideoGeneratorShell,
+    MetaAiSubmitShell, MetaAiCollectShell,
+)
+from .meta_ai_metrics import MetaAiMetricsNode
 
 # Combinar los mappings
 NODE_CLASS_MAPPINGS = {
-    **t2i_mappings,
-    "MetaAiBrowserNode": MetaAiBrowserNode,
-    "MetaAiSingleVideoGenerator": MetaAiSingleVideoGenerator,
+    "MetaAiImageGenerator": MetaAiImageGeneratorShell,
+    "MetaAiBrowserNode": MetaAiBrowserNodeShell,
+    "MetaAiSingleVideoGenerator": MetaAiSingleVideoGeneratorShell,
+    "MetaAiMetricsNode": MetaAiMetricsNode,
+    "MetaAiSubmit": MetaAiSubmitShell,
+    "MetaAiCollect": MetaAiCollectShell,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    **t2i_display_mappings,
+    "MetaAiImageGenerator": "Meta AI Image Generator",
     "MetaAiBrowserNode": "Meta AI Browser Launcher",
-    "MetaAiSingleVideoGenerator": "Meta AI Single Video Generator"
+    "MetaAiSingleVideoGenerator": "Meta AI Single Video Generator",
+    "MetaAiMetricsNode": "Meta AI Metrics",
+    "MetaAiSubmit": "Meta AI Submit Job",
+    "MetaAiCollect": "Meta AI Collect Job",
 }
 
 
-__all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
\ No newline at end of file
+__all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
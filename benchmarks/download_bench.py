@@ -0,0 +1,81 @@
+# ComfyUI_MetaAi/benchmarks/download_bench.py
+"""
+Benchmark y comprobación del descargador de medios (meta_ai_download.py).
+
+Levanta el sitio falso con un video del tamaño indicado y lo descarga varias
+veces por rangos en paralelo y de una sola vez, con cortes de conexión y
+errores 5xx simulados. Cada descarga se compara byte a byte con el original;
+informa el tiempo medio, el throughput y cuántas peticiones de rango y
+cortes hubo (los cortes deben reanudarse sin repetir lo ya descargado).
+
+Uso (desde la carpeta del nodo):
+    python benchmarks/download_bench.py --size-mb 32 --runs 5 --drop-rate 0.2
+"""
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+from fake_meta_ai import FakeMetaAiServer
+from run_benchmarks import load_package, submodule
+
+
+async def run_mode(server, work_dir, label, downloader, runs):
+    url = f"{server.base_url}/media/video/bench.mp4"
+    samples = []
+    for i in range(runs):
+        dest = work_dir / f"{label}_{i}.mp4"
+        started = time.perf_counter()
+        await downloader.download(url, dest)
+        samples.append(time.perf_counter() - started)
+        if dest.read_bytes() != server._mp4:
+            raise SystemExit(f"[ERROR] {label}: la descarga {i} no coincide con el original")
+        leftovers = list(work_dir.glob("*.part*"))
+        if leftovers:
+            raise SystemExit(f"[ERROR] {label}: quedaron temporales {leftovers}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del descargador de medios")
+    parser.add_argument("--size-mb", type=float, default=32.0, help="Tamaño del video servido")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--parallel", type=int, default=4, help="Segmentos simultáneos por descarga")
+    parser.add_argument("--drop-rate", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    server = FakeMetaAiServer(
+        latency=0.0, jitter=0.0, error_rate=args.error_rate, drop_rate=args.drop_rate,
+        video_padding=int(args.size_mb * 1024 * 1024), seed=args.seed
+    ).start()
+    work_dir = Path(tempfile.mkdtemp(prefix="meta_ai_download_"))
+    try:
+        load_package()
+        download = submodule("meta_ai_download")
+        modes = {
+            "ranges": download.AsyncDownloader(retries=8, backoff=0.05, max_parallel=args.parallel),
+            "single": download.AsyncDownloader(retries=8, backoff=0.05, max_parallel=1),
+        }
+        size_mb = len(server._mp4) / (1024 * 1024)
+        print(f"Video de {size_mb:.1f} MB, {args.runs} descargas por modo")
+        for label, downloader in modes.items():
+            before = dict(server.stats)
+            samples = asyncio.run(run_mode(server, work_dir, label, downloader, args.runs))
+            mean = statistics.mean(samples)
+            print(f"{label:<7} media {mean * 1000:8.1f} ms  {size_mb / mean:8.1f} MB/s  "
+                  f"rangos={server.stats['range_requests'] - before['range_requests']}  "
+                  f"cortes={server.stats['media_drops'] - before['media_drops']}  "
+                  f"errores={server.stats['media_errors'] - before['media_errors']}")
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+# ComfyUI_MetaAi/benchmarks/fake_meta_ai.py
+"""
+Sitio falso de Meta AI para medir los nodos sin tocar el servicio real.
+
+Sirve una página /media con los mismos selectores que usan los nodos
+(textbox, botones de aspect ratio por aria-label, "Download media",
+"Image"/"Video", "Upload image", "Animate", overlay de desenfoque, <video>
+y los menús "More options" -> "Delete chat" -> "Delete") y simula la
+latencia y los fallos de la generación:
+
+- latency / jitter: segundos que tarda cada generación (uniforme ± jitter).
+- failure_rate: probabilidad de que una generación no termine nunca (el nodo
+  acaba por timeout; en video eso son los 150 s de espera del nodo).
+- error_rate: probabilidad de que una descarga de medios devuelva HTTP 500.
+- drop_rate: probabilidad de que una descarga de medios se corte a mitad del
+  cuerpo (para probar la reanudación por rangos del descargador).
+- video_padding: bytes de relleno (una caja MP4 "free", el video sigue siendo
+  válido) para simular videos del tamaño real.
+
+Los medios aceptan `Range: bytes=a-b` (206) e `If-Range`, y anuncian
+Accept-Ranges, ETag y Digest (sha-256) como haría un CDN.
+
+Uso independiente:
+    python benchmarks/fake_meta_ai.py --port 8765 --latency 2
+y luego META_AI_MEDIA_URL=http://127.0.0.1:8765/media al arrancar ComfyUI.
+"""
+import io
+import os
+import base64
+import hashlib
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+PAGE_HTML = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Meta AI (fake)</title>
+<style>
+  body { font-family: sans-serif; margin: 0; display: flex; }
+  nav { width: 220px; border-right: 1px solid #ccc; padding: 8px; }
+  main { flex: 1; padding: 16px; position: relative; }
+  .chat { display: flex; justify-content: space-between; padding: 4px; }
+  [role="button"], [role="menuitem"], [role="menuitemradio"] { cursor: pointer; padding: 4px 8px; border: 1px solid #999; display: inline-block; }
+  [aria-disabled="true"] { opacity: .4; }
+  #ratio-menu, #mode-menu, .menu, .dialog { border: 1px solid #333; background: #fff; padding: 4px; }
+  .hidden { display: none !important; }
+  div[role="textbox"] { border: 1px solid #333; min-height: 40px; padding: 6px; margin: 8px 0; }
+  .result img { width: 128px; height: 128px; margin: 4px; }
+  .overlay { position: absolute; inset: 0; }
+</style>
+</head>
+<body>
+<nav id="chats"></nav>
+<main>
+  <div id="modes">
+    <div role="button" id="mode-image">Image</div>
+    <div id="mode-menu" class="hidden"><div role="button" id="mode-video">Video</div></div>
+  </div>
+  <div id="ratios"></div>
+  <div id="ratio-menu" class="hidden"></div>
+  <div id="upload" class="hidden">
+    <div role="button" id="upload-btn">Upload image</div>
+    <input type="file" id="file-input" accept="image/*" class="hidden">
+    <span id="upload-name"></span>
+  </div>
+  <div role="textbox" contenteditable="true" id="prompt"></div>
+  <div id="animate" class="hidden"><div role="button" id="animate-btn" tabindex="-1" aria-disabled="true">Animate</div></div>
+  <div id="results"></div>
+</main>
+<script>
+const RATIOS = ["1:1", "16:9", "9:16"];
+let ratio = "1:1";
+let mode = "image";
+let uploaded = false;
+
+const $ = (id) => document.getElementById(id);
+
+async function api(path, method = "GET", body = null) {
+  const response = await fetch(path, {
+    method, headers: { "Content-Type": "application/json" },
+    body: body ? JSON.stringify(body) : null,
+  });
+  return response.json();
+}
+
+function renderRatios() {
+  // Botones solo con icono (sin texto): el seleccionado lleva un svg relleno
+  $("ratios").innerHTML = RATIOS.map(r =>
+    `<div role="button" aria-label="${r}" data-ratio="${r}">` +
+    `<svg width="16" height="16" fill="${r === ratio ? "currentColor" : "none"}"><rect width="16" height="16" stroke="black"/></svg></div>`
+  ).join("");
+  document.querySelectorAll("#ratios [data-ratio]").forEach(btn => btn.onclick = () => {
+    $("ratio-menu").innerHTML = RATIOS.map(r => `<div role="menuitemradio" data-pick="${r}">${r}</div>`).join("");
+    $("ratio-menu").classList.remove("hidden");
+    document.querySelectorAll("#ratio-menu [data-pick]").forEach(opt => opt.onclick = () => {
+      ratio = opt.dataset.pick;
+      $("ratio-menu").classList.add("hidden");
+      $("ratio-menu").innerHTML = "";
+      renderRatios();
+    });
+  });
+}
+
+async function renderChats() {
+  const chats = await api("/api/chats");
+  $("chats").innerHTML = "";
+  for (const chat of chats) {
+    const row = document.createElement("div");
+    row.className = "chat";
+    row.innerHTML = `<span></span><div role="button" aria-label="More options">...</div>`;
+    row.querySelector("span").textContent = chat.title;
+    row.querySelector('[aria-label="More options"]').onclick = () => openChatMenu(row, chat.id);
+    $("chats").appendChild(row);
+  }
+}
+
+function openChatMenu(row, chatId) {
+  const menu = document.createElement("div");
+  menu.className = "menu";
+  menu.setAttribute("role", "menu");
+  menu.innerHTML = `<div role="menuitem">Delete chat</div>`;
+  menu.querySelector('[role="menuitem"]').onclick = () => {
+    menu.remove();
+    const dialog = document.createElement("div");
+    dialog.className = "dialog";
+    dialog.setAttribute("role", "dialog");
+    dialog.innerHTML = `<div role="button" aria-label="Delete"><span>Delete</span></div>`;
+    dialog.querySelector('[aria-label="Delete"]').onclick = async () => {
+      await api(`/api/chats/${chatId}`, "DELETE");
+      dialog.remove();
+      row.remove();
+    };
+    document.body.appendChild(dialog);
+  };
+  document.addEventListener("keydown", (e) => { if (e.key === "Escape") menu.remove(); }, { once: true });
+  document.body.appendChild(menu);
+}
+
+function promptText() {
+  return ($("prompt").innerText || "").trim();
+}
+
+function updateAnimate() {
+  const enabled = mode === "video" && uploaded && promptText().length > 0;
+  $("animate-btn").setAttribute("tabindex", enabled ? "0" : "-1");
+  $("animate-btn").setAttribute("aria-disabled", enabled ? "false" : "true");
+}
+
+async function generateImages(text) {
+  const job = await api("/api/generate", "POST", { kind: "image", prompt: text, ratio });
+  await renderChats();
+  if (job.fail) return;  // Generación colgada: el nodo acabará por timeout
+  setTimeout(() => {
+    const block = document.createElement("div");
+    block.className = "result";
+    for (let i = 1; i <= 4; i++) {
+      const wrapper = document.createElement("div");
+      wrapper.setAttribute("aria-label", "Download media");
+      wrapper.setAttribute("role", "button");
+      const img = document.createElement("img");
+      img.alt = "Media generated by meta.ai";
+      img.src = `${location.origin}/media/img/${job.id}_${i}.jpg`;
+      wrapper.appendChild(img);
+      wrapper.onclick = () => {
+        const link = document.createElement("a");
+        link.href = img.src + "?download=1";
+        link.download = `${job.id}_${i}.jpg`;
+        document.body.appendChild(link);
+        link.click();
+        link.remove();
+      };
+      block.appendChild(wrapper);
+    }
+    $("results").appendChild(block);
+  }, job.delay_ms);
+}
+
+async function generateVideo(text) {
+  const job = await api("/api/generate", "POST", { kind: "video", prompt: text });
+  await renderChats();
+  const overlay = document.createElement("div");
+  overlay.className = "overlay";
+  overlay.setAttribute("style", "--x-backdropFilter: blur(12px); backdrop-filter: blur(12px);");
+  $("results").appendChild(overlay);
+  if (job.fail) return;  // El overlay no desaparece nunca
+  setTimeout(() => {
+    overlay.remove();
+    const video = document.createElement("video");
+    video.muted = true;
+    video.autoplay = true;
+    video.setAttribute("src", `${location.origin}/media/video/${job.id}.mp4`);
+    $("results").appendChild(video);
+  }, job.delay_ms);
+}
+
+$("mode-image").onclick = () => {
+  mode = "image";
+  $("mode-menu").classList.remove("hidden");
+  $("upload").classList.add("hidden");
+  $("animate").classList.add("hidden");
+};
+$("mode-video").onclick = () => {
+  mode = "video";
+  $("mode-menu").classList.add("hidden");
+  $("upload").classList.remove("hidden");
+  $("animate").classList.remove("hidden");
+  updateAnimate();
+};
+$("upload-btn").onclick = () => $("file-input").click();
+$("file-input").onchange = () => {
+  const file = $("file-input").files[0];
+  uploaded = !!file;
+  $("upload-name").textContent = file ? file.name : "";
+  updateAnimate();
+};
+$("prompt").addEventListener("input", updateAnimate);
+$("prompt").addEventListener("keydown", (e) => {
+  if (e.key === "Enter" && mode === "image") {
+    e.preventDefault();
+    const text = promptText();
+    if (text) {
+      $("prompt").innerHTML = "";
+      generateImages(text);
+    }
+  }
+});
+$("animate-btn").onclick = () => {
+  if ($("animate-btn").getAttribute("aria-disabled") === "true") return;
+  generateVideo(promptText());
+};
+
+renderRatios();
+renderChats();
+</script>
+</body>
+</html>
+"""
+
+
+def _make_jpeg(size=512):
+    img = Image.new("RGB", (size, size), (40, 90, 160))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((size // 4, size // 4, 3 * size // 4, 3 * size // 4), fill=(230, 180, 60))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _make_mp4(frames=48, size=256, fps=24):
+    fd, path = tempfile.mkstemp(suffix=".mp4")
+    os.close(fd)
+    try:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (size, size))
+        for i in range(frames):
+            frame = np.full((size, size, 3), (i * 5) % 255, dtype=np.uint8)
+            cv2.circle(frame, (i * size // frames, size // 2), size // 8, (60, 180, 230), -1)
+            writer.write(frame)
+        writer.release()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+class FakeMetaAiServer:
+    """Servidor HTTP local (en un hilo) que imita meta.ai/media."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=2.0, jitter=0.5, failure_rate=0.0, error_rate=0.0,
+                 drop_rate=0.0, video_padding=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.stats = {
+            "generations": 0, "hung": 0, "media_requests": 0, "media_errors": 0,
+            "range_requests": 0, "media_drops": 0, "chats_deleted": 0,
+        }
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._chats = {}
+        self._next_id = 1
+        self._jpeg = _make_jpeg()
+        self._mp4 = _make_mp4()
+        if video_padding > 0:
+            self._mp4 += (video_padding + 8).to_bytes(4, "big") + b"free" + os.urandom(video_padding)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def media_url(self):
+        return f"{self.base_url}/media"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="FakeMetaAi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    # --- Estado simulado ---
+
+    def _new_job(self, kind, prompt):
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            self._chats[job_id] = {"id": job_id, "title": f"{kind}: {prompt[:40]}"}
+            self.stats["generations"] += 1
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.stats["hung"] += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        return {"id": job_id, "delay_ms": int(delay * 1000), "fail": fail}
+
+    def _media_fails(self):
+        with self._lock:
+            self.stats["media_requests"] += 1
+            if self._random.random() < self.error_rate:
+                self.stats["media_errors"] += 1
+                return True
+        return False
+
+    def _media_drops(self):
+        with self._lock:
+            if self._random.random() < self.drop_rate:
+                self.stats["media_drops"] += 1
+                return True
+        return False
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type, extra_headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                for name, value in (extra_headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _send_media(self, body, content_type, extra_headers):
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                headers = {
+                    **extra_headers, "Accept-Ranges": "bytes", "ETag": etag,
+                    "Digest": "sha-256=" + base64.b64encode(hashlib.sha256(body).digest()).decode(),
+                }
+                status, start, end = 200, 0, len(body) - 1
+                requested = self.headers.get("Range", "")
+                if_range = self.headers.get("If-Range")
+                if requested.startswith("bytes=") and self.command != "HEAD" and if_range in (None, etag):
+                    first, _, last = requested[6:].partition("-")
+                    start = int(first or 0)
+                    end = min(int(last), end) if last else end
+                    if start > end:
+                        return self._send(416, b"", content_type, {"Content-Range": f"bytes */{len(body)}"})
+                    status = 206
+                    headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                    headers.pop("Digest")  # El checksum es del archivo completo
+                    with server._lock:
+                        server.stats["range_requests"] += 1
+                chunk = body[start:end + 1]
+                if self.command != "HEAD" and server._media_drops():
+                    # Anuncia el tamaño completo pero corta la conexión a mitad
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(chunk)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(chunk[:len(chunk) // 2])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self._send(status, chunk, content_type, headers)
+
+            def _json(self, data, status=200):
+                self._send(status, json.dumps(data).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/media":
+                    return self._send(200, PAGE_HTML.encode("utf-8"), "text/html; charset=utf-8")
+                if url.path == "/api/chats":
+                    with server._lock:
+                        return self._json(list(server._chats.values()))
+                if url.path.startswith("/media/img/") or url.path.startswith("/media/video/"):
+                    if server._media_fails():
+                        return self._send(500, b"simulated error", "text/plain")
+                    is_video = url.path.startswith("/media/video/")
+                    body = server._mp4 if is_video else server._jpeg
+                    headers = {}
+                    if "download" in parse_qs(url.query):
+                        headers["Content-Disposition"] = f'attachment; filename="{os.path.basename(url.path)}"'
+                    return self._send_media(body, "video/mp4" if is_video else "image/jpeg", headers)
+                self._send(404, b"not found", "text/plain")
+
+            do_HEAD = do_GET
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if url.path == "/api/generate":
+                    return self._json(server._new_job(payload.get("kind", "image"), payload.get("prompt", "")))
+                self._send(404, b"not found", "text/plain")
+
+            def do_DELETE(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/api/chats/"):
+                    with server._lock:
+                        removed = server._chats.pop(int(url.path.rsplit("/", 1)[1]), None)
+                        if removed:
+                            server.stats["chats_deleted"] += 1
+                    return self._json({"deleted": bool(removed)})
+                self._send(404, b"not found", "text/plain")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sitio falso de Meta AI para benchmarks offline")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeMetaAiServer(
+        port=args.port, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, error_rate=args.error_rate,
+        drop_rate=args.drop_rate
+    ).start()
+    print(f"Sitio falso en {server.media_url} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
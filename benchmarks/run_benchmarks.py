@@ -0,0 +1,231 @@
+# ComfyUI_MetaAi/benchmarks/run_benchmarks.py
+"""
+Benchmark offline de MetaAiImageGenerator y MetaAiSingleVideoGenerator.
+
+Levanta el sitio falso de fake_meta_ai.py, apunta los nodos a él con
+META_AI_MEDIA_URL y ejecuta los escenarios single, batch (secuencial) y
+concurrent de cada nodo de principio a fin (navegador real, subida,
+espera, descarga y decodificación). Para cada escenario informa:
+
+- latencia por trabajo (p50/p95, a partir de las métricas de JobTrace),
+- throughput (trabajos correctos por segundo de reloj),
+- memoria pico (RSS de Python y de los procesos del navegador).
+
+Las salidas, el catálogo, la caché, las métricas, la tabla de selectores y
+el perfil del navegador van a un directorio temporal, nunca a output/ de
+ComfyUI ni a la carpeta del nodo.
+
+Uso (desde la carpeta del nodo):
+    python benchmarks/run_benchmarks.py --jobs 8 --concurrency 4 --latency 2 --json bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import importlib
+import importlib.util
+from pathlib import Path
+
+import psutil
+
+from fake_meta_ai import FakeMetaAiServer
+
+ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "comfyui_meta_ai"
+SCENARIOS = ["image_single", "image_batch", "image_concurrent", "video_single", "video_batch", "video_concurrent"]
+
+
+def load_package():
+    """Importa la carpeta del nodo como paquete (usa imports relativos, como en ComfyUI)."""
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def submodule(name):
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+class MemorySampler:
+    """Muestrea en un hilo el RSS de este proceso y de sus hijos (el navegador)."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_python = 0
+        self.peak_browser = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        process = psutil.Process()
+        while not self._stop.is_set():
+            try:
+                self.peak_python = max(self.peak_python, process.memory_info().rss)
+                browser = 0
+                for child in process.children(recursive=True):
+                    try:
+                        browser += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                self.peak_browser = max(self.peak_browser, browser)
+            except psutil.Error:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def make_node(cls, output_dir):
+    # Sin pasar por __init__ para no crear carpetas en output/ de ComfyUI
+    node = cls.__new__(cls)
+    node.output_dir = output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return node
+
+
+async def run_scenario(name, args, work_dir, nodes, torch):
+    kind, shape = name.split("_", 1)
+    jobs = 1 if shape == "single" else args.jobs
+    concurrency = args.concurrency if shape == "concurrent" else 1
+    prompts = [f"benchmark {name} prompt {i}" for i in range(jobs)]
+    # Con --profiles > 1 los trabajos se reparten entre varios perfiles (cuentas)
+    profiles = ",".join(str(work_dir / f"profile{i}") for i in range(args.profiles))
+    common = dict(
+        browser_mode=args.browser_mode, chat_cleanup=args.chat_cleanup,
+        max_concurrency=concurrency * args.profiles, profile_concurrency=concurrency,
+    )
+
+    started = time.perf_counter()
+    if kind == "image":
+        images, prompt_index = await nodes["image"].generate_images(
+            "\n".join(prompts), args.timeout, "1:1", True, profile_name=profiles,
+            batch_mode=jobs > 1, **common
+        )
+        succeeded = len({index for index in prompt_index if index >= 0})
+    else:
+        frames = torch.rand((jobs, 256, 256, 3), dtype=torch.float32)
+        video_paths, _ = await nodes["video"].generate_video(
+            frames, "\n".join(prompts), profiles, "", True,
+            batch_pairing="single" if jobs == 1 else "zip", return_frames=args.return_frames, **common
+        )
+        succeeded = sum(1 for path in video_paths if path is not None)
+    elapsed = time.perf_counter() - started
+    return jobs, succeeded, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de los nodos MetaAI")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Lista separada por comas")
+    parser.add_argument("--jobs", type=int, default=6, help="Trabajos en los escenarios batch y concurrent")
+    parser.add_argument("--concurrency", type=int, default=3, help="Trabajos simultáneos por perfil")
+    parser.add_argument("--profiles", type=int, default=1, help="Perfiles entre los que repartir los trabajos")
+    parser.add_argument("--latency", type=float, default=2.0, help="Segundos por generación en el sitio falso")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Generaciones que no terminan nunca")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Descargas de medios con HTTP 500")
+    parser.add_argument("--timeout", type=int, default=30, help="Timeout del nodo de imágenes")
+    parser.add_argument("--browser-mode", default="headless", choices=["visible", "offscreen", "headless"])
+    parser.add_argument("--chat-cleanup", default="off", choices=["per_job", "every_n", "on_idle", "off"])
+    parser.add_argument("--return-frames", action="store_true", help="Decodificar también los frames de video")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--keep", action="store_true", help="No borrar el directorio de trabajo")
+    args = parser.parse_args()
+
+    server = FakeMetaAiServer(
+        latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+        error_rate=args.error_rate, seed=args.seed
+    ).start()
+    # Debe definirse antes de importar el paquete
+    os.environ["META_AI_MEDIA_URL"] = server.media_url
+    work_dir = Path(tempfile.mkdtemp(prefix="meta_ai_bench_"))
+
+    import_started = time.perf_counter()
+    load_package()
+    import_seconds = time.perf_counter() - import_started
+    import torch
+
+    # Catálogo, caché y métricas aislados en el directorio de trabajo
+    catalog_module = submodule("meta_ai_catalog")
+    cache_module = submodule("meta_ai_cache")
+    metrics_module = submodule("meta_ai_metrics")
+    catalog_module._catalog = catalog_module.ArtifactCatalog(work_dir / "catalog.sqlite3")
+    cache_module._cache = cache_module.ResultCache(work_dir / "cache")
+    # Lo aprendido contra el sitio falso no debe reordenar las estrategias del meta.ai real
+    dom_module = submodule("meta_ai_dom")
+    dom_module._table = dom_module.SelectorTable(work_dir / "selectors.json")
+
+    nodes = {
+        "image": make_node(submodule("meta_ai_t2i_nodes").MetaAiImageGenerator, work_dir / "meta_ai_image"),
+        "video": make_node(submodule("meta_ai_i2v_single").MetaAiSingleVideoGenerator, work_dir / "meta_ai"),
+    }
+
+    results = []
+    print(f"Sitio falso: {server.media_url}  |  trabajo: {work_dir}  |  import del paquete: {import_seconds:.2f}s")
+    print(f"{'escenario':<18}{'ok/total':>10}{'reloj s':>10}{'trab/s':>9}{'p50 s':>9}{'p95 s':>9}{'RSS py MB':>11}{'RSS nav MB':>12}")
+    try:
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in SCENARIOS:
+                print(f"[WARN] Escenario desconocido: {name}", file=sys.stderr)
+                continue
+            # Un registro de métricas por escenario para aislar sus percentiles
+            metrics = metrics_module.MetricsRegistry(work_dir / "metrics" / name)
+            metrics_module._metrics = metrics
+            with MemorySampler() as memory:
+                jobs, succeeded, elapsed = asyncio.run(run_scenario(name, args, work_dir, nodes, torch))
+
+            stats = metrics.summary().get(name.split("_", 1)[0], {})
+            total = stats.get("phases", {}).get("total", {})
+            row = {
+                "scenario": name,
+                "jobs": jobs,
+                "succeeded": succeeded,
+                "wall_s": round(elapsed, 3),
+                "throughput_jobs_s": round(succeeded / elapsed, 3) if elapsed else 0.0,
+                "latency_p50_s": total.get("p50", 0.0),
+                "latency_p95_s": total.get("p95", 0.0),
+                "timeout_rate": stats.get("timeout_rate", 0.0),
+                "phases": stats.get("phases", {}),
+                "peak_rss_python_mb": round(memory.peak_python / 2 ** 20, 1),
+                "peak_rss_browser_mb": round(memory.peak_browser / 2 ** 20, 1),
+            }
+            results.append(row)
+            print(f"{name:<18}{f'{succeeded}/{jobs}':>10}{row['wall_s']:>10.2f}{row['throughput_jobs_s']:>9.2f}"
+                  f"{row['latency_p50_s']:>9.2f}{row['latency_p95_s']:>9.2f}"
+                  f"{row['peak_rss_python_mb']:>11.1f}{row['peak_rss_browser_mb']:>12.1f}")
+    finally:
+        submodule("meta_ai_browser_pool").get_browser_pool().shutdown()
+        server.stop()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "config": vars(args),
+        "package_import_s": round(import_seconds, 3),
+        "server": server.stats,
+        "scenarios": results,
+    }
+    print(f"Servidor: {json.dumps(server.stats)}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
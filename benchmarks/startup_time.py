@@ -0,0 +1,69 @@
+# ComfyUI_MetaAi/benchmarks/startup_time.py
+"""
+Mide lo que el paquete añade al arranque de ComfyUI.
+
+Cada medida se hace en un intérprete nuevo: "lazy" carga el paquete como lo
+hace ComfyUI (solo las clases ligeras registradas); "eager" importa además
+los módulos de los nodos, que es lo que hacía antes __init__.py. Informa la
+mediana de varias ejecuciones y qué dependencias pesadas quedaron cargadas.
+
+Uso (desde la carpeta del nodo):
+    python benchmarks/startup_time.py --runs 5
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["playwright", "torch", "cv2", "numpy", "PIL", "requests", "psutil"]
+
+_PROBE = """
+import sys, time, json, importlib, importlib.util
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location(
+    "comfyui_meta_ai", {init!r}, submodule_search_locations=[{root!r}]
+)
+module = importlib.util.module_from_spec(spec)
+sys.modules["comfyui_meta_ai"] = module
+spec.loader.exec_module(module)
+nodes = len(module.NODE_CLASS_MAPPINGS)
+if {eager!r}:
+    for name in ("meta_ai_t2i_nodes", "meta_ai_open", "meta_ai_i2v_single"):
+        importlib.import_module("comfyui_meta_ai." + name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "nodes": nodes,
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure(eager):
+    code = _PROBE.format(init=str(ROOT / "__init__.py"), root=str(ROOT), eager=eager, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de carga del paquete MetaAI")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-eager", action="store_true", help="No medir la carga completa (p. ej. sin dependencias)")
+    args = parser.parse_args()
+
+    modes = [("lazy", False)] if args.skip_eager else [("lazy", False), ("eager", True)]
+    medians = {}
+    for label, eager in modes:
+        samples = [measure(eager) for _ in range(args.runs)]
+        medians[label] = statistics.median(sample["seconds"] for sample in samples)
+        print(f"{label:<6} mediana {medians[label] * 1000:8.1f} ms  nodos={samples[-1]['nodes']}  "
+              f"dependencias cargadas: {', '.join(samples[-1]['heavy_loaded']) or 'ninguna'}")
+    if "eager" in medians:
+        print(f"Ahorro en el arranque: {(medians['eager'] - medians['lazy']) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+# ComfyUI_MetaAi/meta_ai_browser_pool.py
+import os
+import sys
+import time
+import atexit
+import asyncio
+import threading
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from .meta_ai_cdp import find_endpoint
+from .meta_ai_options import BROWSER_MODES
+from .meta_ai_profiles import get_profile_manager
+
+# Se puede redirigir (p. ej. al sitio falso de benchmarks/) con la variable de entorno
+META_AI_MEDIA_URL = os.environ.get("META_AI_MEDIA_URL", "https://www.meta.ai/media")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-features=TranslateUI,msUnifiedAppUIToolbar,CalculateNativeWinOcclusion",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-infobars",
+    "--disable-session-crashed-bubble",
+    "--lang=en-US",
+]
+
+# Evita que las pestañas en segundo plano se consideren ocultas
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    Object.defineProperty(document, 'hidden', { value: false });
+    Object.defineProperty(document, 'visibilityState', { value: 'visible' });
+    document.dispatchEvent(new Event('visibilitychange'));
+"""
+
+
+class BrowserOptions:
+    """
+    Opciones de un trabajo del pool.
+
+    mode: "visible" (ventana maximizada), "offscreen" (ventana real fuera de
+    la pantalla) o "headless" (sin ventana, para máquinas sin display).
+    blocked_hosts: dominios (incluye subdominios) bloqueados por CDP con
+    Network.setBlockedURLs, que no desactiva la caché HTTP del navegador.
+    blocked_types: tipos de recurso de Playwright ("font", "media", ...) que
+    se abortan con page.route; interceptar las peticiones desactiva la caché
+    HTTP de la pestaña, así que solo se activa si se pide algún tipo.
+    """
+
+    def __init__(self, mode="visible", blocked_types=(), blocked_hosts=()):
+        self.mode = mode if mode in BROWSER_MODES else "visible"
+        self.blocked_types = frozenset(t.strip().lower() for t in blocked_types if t.strip())
+        self.blocked_hosts = tuple(h.strip().lower().lstrip(".") for h in blocked_hosts if h.strip())
+
+    @classmethod
+    def from_inputs(cls, mode, block_resources, blocked_types, blocked_hosts):
+        """Construye las opciones a partir de los widgets de texto de un nodo."""
+        if not block_resources:
+            return cls(mode)
+        return cls(mode, blocked_types.split(","), blocked_hosts.split(","))
+
+    def launch_kwargs(self):
+        if self.mode == "headless":
+            return {"headless": True, "args": LAUNCH_ARGS, "viewport": {"width": 1366, "height": 900}}
+        if self.mode == "offscreen":
+            args = LAUNCH_ARGS + ["--window-position=-32000,-32000", "--window-size=1366,900"]
+            return {"headless": False, "args": args, "viewport": None}
+        return {"headless": False, "args": ["--start-maximized"] + LAUNCH_ARGS, "viewport": None}
+
+    def blocked_url_patterns(self):
+        """Patrones de Network.setBlockedURLs para cada dominio y sus subdominios."""
+        return [pattern for h in self.blocked_hosts for pattern in (f"*://{h}/*", f"*://*.{h}/*")]
+
+
+class _ProfileContext:
+    """Contexto persistente de un perfil y sus pestañas reutilizables."""
+
+    def __init__(self, user_data_dir, max_pages):
+        self.user_data_dir = user_data_dir
+        self.context = None
+        self.idle_pages = []
+        self.uses = {}
+        self.busy = 0
+        self.slots = asyncio.Semaphore(max_pages)
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.launches = 0
+        self.mode = None
+        self.browser = None  # Solo si está conectado por CDP a un navegador ajeno
+
+
+class BrowserPool:
+    """
+    Pool de navegadores compartido por todo el proceso.
+
+    Playwright vive en un event loop propio (hilo de fondo), de modo que los
+    contextos siguen calientes entre ejecuciones del grafo aunque ComfyUI cree
+    un loop nuevo para cada elemento de la cola.
+
+    Si MetaAiBrowserNode tiene abierto el mismo perfil (registrado en
+    meta_ai_cdp), el pool se conecta a ese navegador por CDP y trabaja en
+    pestañas nuevas suyas, sin lanzar otro ni tocar las del usuario.
+    """
+
+    def __init__(self, idle_timeout=300, max_pages_per_profile=8, max_page_uses=25, health_timeout=5.0):
+        self.idle_timeout = idle_timeout
+        self.max_pages_per_profile = max_pages_per_profile
+        self.max_page_uses = max_page_uses
+        self.health_timeout = health_timeout
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._profiles = {}
+        self._closing = {}  # perfil -> asyncio.Event que se activa al terminar de cerrarlo
+        self._reaper = None
+
+    # --- Loop de fondo ---
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._loop_main, args=(ready,), name="MetaAiBrowserPool", daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+        return self._loop
+
+    def _loop_main(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def submit(self, coro):
+        """Programa una corrutina en el loop del pool y devuelve un concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def run(self, user_data_dir, job, *args, browser_options=None, trace=None, **kwargs):
+        """
+        Ejecuta `await job(page, *args, **kwargs)` en una pestaña caliente del perfil
+        y devuelve su resultado. Se puede llamar desde cualquier event loop.
+
+        Sin `browser_options` se usa el navegador tal como esté abierto (o el
+        modo visible por defecto si hay que lanzarlo). Con `trace` (JobTrace)
+        se miden la espera por una pestaña libre y su obtención/lanzamiento.
+        """
+        future = self.submit(self._run_job(str(Path(user_data_dir).resolve()), job, args, kwargs, browser_options, trace))
+        return await asyncio.wrap_future(future)
+
+    def concurrent_jobs(self, page):
+        """Número de trabajos en curso en el mismo perfil que `page` (incluido el propio)."""
+        for entry in self._profiles.values():
+            if entry.context is not None and entry.context is page.context:
+                return entry.busy
+        return 1
+
+    def profile_busy(self, user_data_dir):
+        """Número de pestañas en uso del perfil (0 si no está abierto)."""
+        entry = self._profiles.get(str(Path(user_data_dir).resolve()))
+        return entry.busy if entry is not None else 0
+
+    # --- Gestión de perfiles y pestañas ---
+
+    async def _run_job(self, user_data_dir, job, args, kwargs, options, trace=None):
+        closing = self._closing.get(user_data_dir)
+        if closing is not None:
+            # El reaper está cerrando este perfil: no lanzar otro navegador sobre el mismo directorio
+            await closing.wait()
+        entry = self._get_profile(user_data_dir)
+        queued = time.monotonic()
+        async with entry.slots:
+            if trace is not None:
+                trace.spans["queue_wait"] = time.monotonic() - queued
+                with trace.span("browser_acquire"):
+                    page = await self._acquire_page(entry, options)
+            else:
+                page = await self._acquire_page(entry, options)
+            healthy = False
+            blocker = None
+            cdp = None
+            try:
+                if options is not None and options.blocked_hosts:
+                    cdp = await self._block_hosts(page, options)
+                if options is not None and options.blocked_types:
+                    blocker = self._make_blocker(options)
+                    await page.route("**/*", blocker)
+                result = await job(page, *args, **kwargs)
+                healthy = True
+                return result
+            finally:
+                if not page.is_closed():
+                    try:
+                        if blocker is not None:
+                            await page.unroute("**/*", blocker)
+                        if cdp is not None:
+                            # La pestaña vuelve al pool: el siguiente trabajo puede pedir otros bloqueos
+                            await cdp.send("Network.setBlockedURLs", {"urls": []})
+                            await cdp.detach()
+                    except Exception:
+                        healthy = False
+                await self._release_page(entry, page, healthy)
+
+    @staticmethod
+    async def _block_hosts(page, options):
+        """Bloquea los dominios por CDP; si no se puede, el trabajo sigue sin bloqueo."""
+        cdp = None
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setBlockedURLs", {"urls": options.blocked_url_patterns()})
+            return cdp
+        except Exception as e:
+            print(f"[WARN] No se pudieron bloquear los dominios por CDP: {e}", file=sys.stderr)
+            if cdp is not None:
+                try:
+                    await cdp.detach()
+                except Exception:
+                    pass
+            return None
+
+    @staticmethod
+    def _make_blocker(options):
+        async def blocker(route):
+            if route.request.resource_type in options.blocked_types:
+                await route.abort()
+            else:
+                await route.continue_()
+        return blocker
+
+    def _get_profile(self, user_data_dir):
+        entry = self._profiles.get(user_data_dir)
+        if entry is None:
+            entry = _ProfileContext(user_data_dir, self.max_pages_per_profile)
+            self._profiles[user_data_dir] = entry
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_idle())
+        return entry
+
+    async def _ensure_context(self, entry, options=None):
+        if entry.context is not None:
+            if options is None or options.mode == entry.mode or entry.browser is not None:
+                return
+            if entry.busy > 0:
+                print(f"[WARN] Perfil en uso en modo '{entry.mode}'; se ignora el modo '{options.mode}' hasta que quede libre", file=sys.stderr)
+                return
+            # Cambio de modo (p. ej. visible -> headless): relanzar el navegador
+            await self._close_profile(entry)
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        options = options or BrowserOptions()
+        endpoint = await asyncio.get_running_loop().run_in_executor(None, find_endpoint, entry.user_data_dir)
+        if endpoint is not None and await self._attach(entry, endpoint):
+            return
+
+        Path(entry.user_data_dir).mkdir(parents=True, exist_ok=True)
+        context = await self._playwright.chromium.launch_persistent_context(
+            entry.user_data_dir,
+            locale="en-US",
+            user_agent=USER_AGENT,
+            accept_downloads=True,
+            ignore_default_args=["--enable-automation"],
+            timeout=30000,
+            **options.launch_kwargs(),
+        )
+        await context.add_init_script(STEALTH_SCRIPT)
+
+        context.on("close", lambda _context: self._forget_context(entry, _context))
+        entry.context = context
+        entry.idle_pages = list(context.pages)
+        entry.uses = {page: 0 for page in entry.idle_pages}
+        entry.launches += 1
+        entry.mode = options.mode
+        print(f"[INFO] Navegador iniciado en modo {options.mode} para el perfil {entry.user_data_dir} (lanzamiento #{entry.launches})")
+
+    async def _attach(self, entry, endpoint):
+        """Se conecta al navegador abierto por MetaAiBrowserNode. False si no responde."""
+        try:
+            browser = await self._playwright.chromium.connect_over_cdp(endpoint, timeout=10000)
+        except Exception as e:
+            print(f"[WARN] No se pudo conectar a {endpoint}; se lanza otro navegador: {e}", file=sys.stderr)
+            return False
+        # El contexto por defecto es el perfil persistente que ya tiene la sesión
+        context = browser.contexts[0] if browser.contexts else await browser.new_context()
+        await context.add_init_script(STEALTH_SCRIPT)
+
+        context.on("close", lambda _context: self._forget_context(entry, _context))
+        browser.on("disconnected", lambda _browser: self._forget_context(entry, context))
+        entry.browser = browser
+        entry.context = context
+        # Las pestañas del usuario no se usan: los trabajos abren las suyas
+        entry.idle_pages = []
+        entry.uses = {}
+        entry.mode = "attached"
+        print(f"[INFO] Conectado por CDP al navegador abierto del perfil {entry.user_data_dir} ({endpoint})")
+        return True
+
+    @staticmethod
+    def _forget_context(entry, context):
+        # Ventana cerrada a mano o Chromium caído: se relanza (o reconecta) en el próximo uso
+        if entry.context is context:
+            entry.context = None
+            entry.browser = None
+            entry.idle_pages.clear()
+            entry.uses.clear()
+
+    async def _is_healthy(self, page):
+        if page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("() => document.readyState"), self.health_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _acquire_page(self, entry, options=None):
+        async with entry.lock:
+            await self._ensure_context(entry, options)
+            page = None
+            while entry.idle_pages:
+                candidate = entry.idle_pages.pop()
+                if await self._is_healthy(candidate):
+                    page = candidate
+                    break
+                await self._discard_page(entry, candidate)
+
+            if page is None:
+                try:
+                    page = await entry.context.new_page()
+                except Exception:
+                    # El contexto murió sin emitir "close": relanzar una vez
+                    await self._close_profile(entry)
+                    await self._ensure_context(entry, options)
+                    page = entry.idle_pages.pop() if entry.idle_pages else await entry.context.new_page()
+                entry.uses.setdefault(page, 0)
+
+            entry.busy += 1
+            entry.last_used = time.monotonic()
+            return page
+
+    async def _release_page(self, entry, page, healthy):
+        entry.busy -= 1
+        entry.last_used = time.monotonic()
+        if entry.context is None:
+            return
+
+        uses = entry.uses.get(page, 0) + 1
+        if healthy and not page.is_closed() and uses < self.max_page_uses:
+            entry.uses[page] = uses
+            entry.idle_pages.append(page)
+        else:
+            await self._discard_page(entry, page)
+
+    async def _discard_page(self, entry, page):
+        entry.uses.pop(page, None)
+        try:
+            # Mantener siempre una pestaña abierta para que Chromium no se cierre
+            if entry.context is not None and len(entry.context.pages) <= 1:
+                fresh = await entry.context.new_page()
+                entry.uses[fresh] = 0
+                entry.idle_pages.append(fresh)
+            if not page.is_closed():
+                await page.close()
+        except Exception as e:
+            print(f"[WARN] Error al descartar pestaña: {e}", file=sys.stderr)
+
+    async def _close_profile(self, entry):
+        context, entry.context = entry.context, None
+        browser, entry.browser = entry.browser, None
+        pages = list(entry.uses)
+        entry.idle_pages.clear()
+        entry.uses.clear()
+        if browser is not None:
+            # Navegador del usuario: cerrar solo nuestras pestañas y desconectar
+            for page in pages:
+                try:
+                    if not page.is_closed():
+                        await page.close()
+                except Exception:
+                    pass
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"[WARN] Error al desconectar de CDP: {e}", file=sys.stderr)
+            return
+        if context is not None:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"[WARN] Error al cerrar contexto: {e}", file=sys.stderr)
+
+    # --- Cierre por inactividad ---
+
+    async def _reap_idle(self):
+        interval = max(1.0, min(30.0, self.idle_timeout / 4))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, entry in list(self._profiles.items()):
+                if entry.busy == 0 and not entry.lock.locked() and now - entry.last_used >= self.idle_timeout:
+                    # Se saca del pool antes del primer await: un trabajo que llegue durante el
+                    # cierre no puede tomar esta entrada, espera y crea una nueva
+                    del self._profiles[key]
+                    closing = self._closing[key] = asyncio.Event()
+                    print(f"[INFO] Cerrando navegador inactivo del perfil {key}")
+                    try:
+                        await self._close_profile(entry)
+                        await self._release_clone(entry)
+                    finally:
+                        del self._closing[key]
+                        closing.set()
+            if not self._profiles:
+                # Se suelta antes del await: un trabajo que llegue mientras se detiene
+                # Playwright (p. ej. uno que esperaba el cierre) arranca su propio reaper
+                self._reaper = None
+                await self._stop_playwright()
+                return
+
+    async def _stop_playwright(self):
+        playwright, self._playwright = self._playwright, None
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception as e:
+                print(f"[WARN] Error al detener Playwright: {e}", file=sys.stderr)
+
+    async def _release_clone(self, entry):
+        # Un clon de meta_ai_profiles devuelve su sesión a la copia golden al cerrarse
+        manager = get_profile_manager()
+        if manager.is_clone(entry.user_data_dir):
+            await asyncio.get_running_loop().run_in_executor(None, manager.release, entry.user_data_dir)
+
+    async def _close_all(self):
+        for entry in list(self._profiles.values()):
+            await self._close_profile(entry)
+            await self._release_clone(entry)
+        self._profiles.clear()
+        await self._stop_playwright()
+
+    def shutdown(self, timeout=10):
+        """Cierra todos los navegadores del pool (bloqueante)."""
+        if self._loop is None or not self._thread.is_alive():
+            return
+        try:
+            self.submit(self._close_all()).result(timeout)
+        except Exception as e:
+            print(f"[WARN] Cierre del pool incompleto: {e}", file=sys.stderr)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Devuelve el pool compartido del proceso (se crea en el primer uso)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.shutdown)
+        return _pool
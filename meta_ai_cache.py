@@ -0,0 +1,212 @@
+# ComfyUI_MetaAi/meta_ai_cache.py
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import threading
+import concurrent.futures
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).parent / "meta_ai_cache"
+
+
+def link_or_copy(src, dst):
+    """Crea `dst` como enlace duro de `src` y, si no es posible, lo copia."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class ResultCache:
+    """
+    Caché en disco de resultados de generación, direccionada por contenido.
+
+    Cada entrada es una carpeta con los archivos generados; un index.json
+    guarda tamaño y fechas para expulsar por antigüedad y por LRU cuando se
+    supera el tamaño máximo.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=2 * 1024 ** 3, max_age=7 * 24 * 3600):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_path = self.root / "index.json"
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(kind, prompt, options=None, data=None):
+        """Hash del prompt normalizado, las opciones y (opcionalmente) los bytes de entrada."""
+        normalized = " ".join(prompt.split())
+        digest = hashlib.sha256()
+        digest.update(json.dumps(
+            {"kind": kind, "prompt": normalized, "options": options or {}}, sort_keys=True
+        ).encode("utf-8"))
+        if data is not None:
+            digest.update(b"\0")
+            digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Devuelve las rutas en caché para `key` o None si no hay entrada válida."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            paths = [self.root / key / name for name in entry["files"]]
+            expired = time.time() - entry["created"] > self.max_age
+            if expired or not all(p.exists() for p in paths):
+                self._remove(key)
+                self._save_index()
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+            return [str(p) for p in paths]
+
+    def put(self, key, paths):
+        """
+        Guarda copias de `paths` bajo `key` y devuelve las rutas dentro de la caché
+        (solo las que siguen existiendo: una lista vacía si no se pudo guardar).
+        """
+        with self._lock:
+            self._remove(key)
+            entry_dir = self.root / key
+            entry_dir.mkdir(parents=True, exist_ok=True)
+            names = []
+            size = 0
+            for i, src in enumerate(paths):
+                name = f"{i:02d}{Path(src).suffix}"
+                link_or_copy(src, entry_dir / name)
+                size += (entry_dir / name).stat().st_size
+                names.append(name)
+            now = time.time()
+            self._index[key] = {"files": names, "size": size, "created": now, "last_access": now}
+            self._evict(protect=key)
+            self._save_index()
+            return [str(entry_dir / name) for name in names if (entry_dir / name).exists()]
+
+    def _evict(self, protect=None):
+        # La entrada recién escrita (`protect`) nunca se expulsa: quien la guardó va a usarla;
+        # si por sí sola supera max_bytes, sale en la siguiente expulsión
+        now = time.time()
+        for key in [k for k, e in self._index.items() if now - e["created"] > self.max_age and k != protect]:
+            self._remove(key)
+
+        total = sum(e["size"] for e in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == protect:
+                continue
+            total -= self._index[key]["size"]
+            self._remove(key)
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARN] Índice de caché ilegible, se reinicia: {e}", file=sys.stderr)
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """
+    Agrupa trabajos idénticos en curso: el primero con una clave la ejecuta y
+    los que lleguen mientras tanto esperan y reciben su mismo resultado (o su
+    misma excepción) en lugar de lanzar otra generación.
+
+    Funciona entre event loops distintos (cada ejecución de ComfyUI y cada
+    trabajo de meta_ai_jobs tiene el suyo) con un concurrent.futures.Future
+    por clave. Si el que ejecuta se cancela, uno de los que esperaban toma
+    su lugar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    async def run(self, key, job):
+        """Devuelve (resultado de `await job()`, True si se compartió el de otro trabajo)."""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = future
+            if leader:
+                return await self._lead(key, future, job), False
+            try:
+                # shield: cancelar a quien espera no cancela el trabajo compartido
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except _LeaderCancelled:
+                continue
+
+    async def _lead(self, key, future, job):
+        try:
+            result = await job()
+        except asyncio.CancelledError:
+            self._done(key)
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            self._done(key)
+            future.set_exception(e)
+            raise
+        self._done(key)
+        future.set_result(result)
+        return result
+
+    def _done(self, key):
+        # Se retira antes de publicar el resultado: quien llegue después empieza de nuevo (o usa la caché)
+        with self._lock:
+            self._calls.pop(key, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_single_flight = None
+
+
+def get_result_cache():
+    """Devuelve la caché compartida del proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def get_single_flight():
+    """Devuelve el agrupador de trabajos en curso compartido del proceso."""
+    global _single_flight
+    with _cache_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
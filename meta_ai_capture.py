@@ -0,0 +1,84 @@
+# ComfyUI_MetaAi/meta_ai_capture.py
+import asyncio
+
+
+class MediaCapture:
+    """
+    Captura los cuerpos de las respuestas de medios que el navegador ya descargó.
+
+    Se engancha a `page.on("response")` y, una vez armada con `arm()` (justo
+    antes de enviar el prompt), guarda por URL las respuestas completas cuyo
+    content-type coincide con `content_types`. Así la descarga posterior se
+    resuelve desde memoria en lugar de pedir otra vez el archivo al CDN.
+    """
+
+    def __init__(self, page, content_types=("image/",), max_bytes=256 * 1024 * 1024):
+        self.page = page
+        self.content_types = tuple(content_types)
+        self.max_bytes = max_bytes
+        self._armed = False
+        self._bodies = {}
+        self._pending = {}
+        self._total = 0
+
+    async def __aenter__(self):
+        self.page.on("response", self._on_response)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.page.remove_listener("response", self._on_response)
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        self._bodies.clear()
+
+    def arm(self):
+        """Empieza a guardar respuestas; lo anterior pertenece a otra generación."""
+        self._bodies.clear()
+        self._total = 0
+        self._armed = True
+
+    def _on_response(self, response):
+        if not self._armed or response.status != 200:
+            # 206 (Range) son trozos parciales de video: no sirven como archivo completo
+            return
+        content_type = response.headers.get("content-type", "")
+        if not content_type.startswith(self.content_types):
+            return
+        url = response.url
+        if url not in self._pending and url not in self._bodies:
+            self._pending[url] = asyncio.ensure_future(self._read_body(response))
+
+    async def _read_body(self, response):
+        url = response.url
+        try:
+            body = await response.body()
+            expected = response.headers.get("content-length")
+            if expected is not None and int(expected) != len(body):
+                return None
+            if self._total + len(body) > self.max_bytes:
+                return None
+            self._total += len(body)
+            self._bodies[url] = body
+            return body
+        except Exception as e:
+            print(f"[DEBUG] Respuesta no capturada {url[:80]}: {e}")
+            return None
+        finally:
+            self._pending.pop(url, None)
+
+    async def take(self, url, wait=5.0):
+        """
+        Devuelve (y libera) los bytes capturados para `url`, esperando como mucho
+        `wait` segundos si la respuesta aún se está leyendo. None si no hay captura.
+        """
+        if url in self._bodies:
+            return self._bodies.pop(url)
+        task = self._pending.get(url)
+        if task is None:
+            return None
+        try:
+            await asyncio.wait_for(asyncio.shield(task), wait)
+        except Exception:
+            return None
+        return self._bodies.pop(url, None)
@@ -0,0 +1,240 @@
+# ComfyUI_MetaAi/meta_ai_catalog.py
+import os
+import glob
+import re
+import sys
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+OUTPUT_ROOT = Path(__file__).parent.parent.parent / "output"
+CATALOG_PATH = OUTPUT_ROOT / "meta_ai_catalog.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    prompt TEXT,
+    options TEXT,
+    hash TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    timings TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_folder_created ON artifacts (folder, created);
+"""
+
+
+class ArtifactCatalog:
+    """
+    Catálogo SQLite de los archivos generados en output/meta_ai y output/meta_ai_image.
+
+    Reparte nombres consecutivos de forma atómica (un contador por prefijo en
+    lugar de listar la carpeta), registra prompt, opciones, hash y tiempos de
+    cada artefacto y aplica políticas de retención en un hilo de fondo.
+    """
+
+    def __init__(self, db_path=CATALOG_PATH, gc_interval=60):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.gc_interval = gc_interval
+        self._retention = {}
+        self._gc_lock = threading.Lock()
+        self._gc_thread = None
+        self._last_gc = 0.0
+        self._in_use = {}  # ruta -> trabajos que aún la usan (la retención no la toca)
+        self._in_use_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Una conexión por operación: el catálogo se usa desde varios hilos
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --- Nombres ---
+
+    def allocate_name(self, folder, prefix, suffix="", digits=3):
+        """
+        Reserva el siguiente nombre `{prefix}_{n}{suffix}` en `folder` y devuelve su Path.
+        El contador se inicializa una única vez a partir de los archivos existentes
+        y salta los números ya ocupados por archivos creados fuera del catálogo
+        (con cualquier terminación: las imágenes usan `{prefix}_{n}_{i}.jpeg`).
+        """
+        folder = Path(folder)
+        counter = f"{folder.name}/{prefix}"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT value FROM counters WHERE name = ?", (counter,)).fetchone()
+                current = row[0] if row else self._scan_highest(folder, prefix)
+                next_value = current + 1
+                while self._number_taken(folder, f"{prefix}_{next_value:0{digits}d}"):
+                    next_value += 1
+                conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                    (counter, next_value),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return folder / f"{prefix}_{next_value:0{digits}d}{suffix}"
+
+    @staticmethod
+    def _number_taken(folder, stem):
+        # `stem` seguido de cualquier cosa que no sea otro dígito (meta_005.mp4, meta_005_concat.mp4...)
+        for match in glob.iglob(os.path.join(glob.escape(str(folder)), glob.escape(stem) + "*")):
+            rest = os.path.basename(match)[len(stem):]
+            if not rest[:1].isdigit():
+                return True
+        return False
+
+    @staticmethod
+    def _scan_highest(folder, prefix):
+        pattern = re.compile(rf"^{re.escape(prefix)}_(\d+)")
+        highest = 0
+        if folder.exists():
+            for entry in os.scandir(folder):
+                match = pattern.match(entry.name)
+                if match:
+                    highest = max(highest, int(match.group(1)))
+        return highest
+
+    # --- Registro ---
+
+    def record(self, path, kind, prompt=None, options=None, content_hash=None, timings=None, in_use=False):
+        """
+        Registra (o actualiza) un artefacto generado y lanza la retención si toca.
+        Con `in_use` la retención no lo borra hasta que se llame a release().
+        """
+        path = Path(path).resolve()
+        if in_use:
+            with self._in_use_lock:
+                self._in_use[str(path)] = self._in_use.get(str(path), 0) + 1
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (folder, path, kind, prompt, options, hash, size, timings, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET kind = excluded.kind, prompt = excluded.prompt, "
+                "options = excluded.options, hash = excluded.hash, size = excluded.size, "
+                "timings = excluded.timings, created = excluded.created",
+                (
+                    path.parent.name, str(path), kind, prompt,
+                    json.dumps(options or {}, sort_keys=True), content_hash, size,
+                    json.dumps(timings or {}), time.time(),
+                ),
+            )
+        self.schedule_gc()
+
+    def release(self, paths):
+        """Devuelve a la retención artefactos registrados con `in_use` (ya consumidos)."""
+        with self._in_use_lock:
+            for path in paths:
+                key = str(Path(path).resolve())
+                remaining = self._in_use.get(key, 0) - 1
+                if remaining > 0:
+                    self._in_use[key] = remaining
+                else:
+                    self._in_use.pop(key, None)
+        self.schedule_gc()
+
+    # --- Retención ---
+
+    def set_retention(self, folder, max_bytes=0, max_age=0, keep_last=0):
+        """
+        Política de retención para una carpeta (0 desactiva cada límite):
+        tamaño total en bytes, antigüedad en segundos y número de artefactos más recientes.
+        """
+        self._retention[Path(folder).name] = (int(max_bytes), float(max_age), int(keep_last))
+
+    def schedule_gc(self, force=False):
+        """Lanza una pasada de retención en segundo plano (como mucho una cada gc_interval)."""
+        if not any(any(policy) for policy in self._retention.values()):
+            return
+        with self._gc_lock:
+            if self._gc_thread is not None and self._gc_thread.is_alive():
+                return
+            if not force and time.monotonic() - self._last_gc < self.gc_interval:
+                return
+            self._last_gc = time.monotonic()
+            self._gc_thread = threading.Thread(target=self._gc_safe, name="MetaAiCatalogGC", daemon=True)
+            self._gc_thread.start()
+
+    def _gc_safe(self):
+        try:
+            removed = self.collect_garbage()
+            if removed:
+                print(f"[INFO] Retención: {removed} archivos antiguos eliminados")
+        except Exception as e:
+            print(f"[WARN] Retención de salidas fallida: {e}", file=sys.stderr)
+
+    def collect_garbage(self):
+        """Aplica las políticas de retención ahora y devuelve cuántos artefactos se borraron."""
+        removed = 0
+        now = time.time()
+        for folder, (max_bytes, max_age, keep_last) in list(self._retention.items()):
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT id, path, size, created FROM artifacts WHERE folder = ? ORDER BY created DESC",
+                    (folder,),
+                ).fetchall()
+
+            doomed = []
+            total = 0
+            for position, (artifact_id, path, size, created) in enumerate(rows):
+                total += size
+                too_many = keep_last and position >= keep_last
+                too_old = max_age and now - created > max_age
+                too_big = max_bytes and total > max_bytes
+                if too_many or too_old or too_big:
+                    doomed.append((artifact_id, path))
+
+            for artifact_id, path in doomed:
+                with self._in_use_lock:
+                    if path in self._in_use:
+                        # Un trabajo en curso aún la usa: se borrará en una pasada posterior
+                        continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"[WARN] No se pudo borrar {path}: {e}", file=sys.stderr)
+                    continue
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM artifacts WHERE id = ?", (artifact_id,))
+                removed += 1
+        return removed
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Devuelve el catálogo compartido del proceso."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ArtifactCatalog()
+        return _catalog
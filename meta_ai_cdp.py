@@ -0,0 +1,83 @@
+# ComfyUI_MetaAi/meta_ai_cdp.py
+import os
+import json
+import time
+import threading
+import urllib.request
+from pathlib import Path
+
+# Navegadores abiertos por MetaAiBrowserNode a los que se pueden conectar los generadores
+REGISTRY_PATH = Path(__file__).parent / "meta_ai_cdp.json"
+
+_registry_lock = threading.Lock()
+
+
+def _key(user_data_dir):
+    return str(Path(user_data_dir).resolve())
+
+
+def _load():
+    try:
+        with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(registry):
+    tmp_path = REGISTRY_PATH.with_name(REGISTRY_PATH.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def read_devtools_port(user_data_dir, timeout=10.0):
+    """
+    Puerto de depuración elegido por Chromium con --remote-debugging-port=0:
+    lo escribe en la primera línea de `DevToolsActivePort` dentro del perfil.
+    """
+    path = Path(user_data_dir) / "DevToolsActivePort"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            port = path.read_text(encoding="utf-8").splitlines()[0].strip()
+            if port.isdigit():
+                return int(port)
+        except (OSError, IndexError):
+            pass
+        time.sleep(0.1)
+    return None
+
+
+def register_endpoint(user_data_dir, endpoint):
+    """Anota el endpoint CDP del navegador abierto con este perfil."""
+    with _registry_lock:
+        registry = _load()
+        registry[_key(user_data_dir)] = {"endpoint": endpoint, "pid": os.getpid(), "started": time.time()}
+        _save(registry)
+
+
+def unregister_endpoint(user_data_dir):
+    with _registry_lock:
+        registry = _load()
+        if registry.pop(_key(user_data_dir), None) is not None:
+            _save(registry)
+
+
+def find_endpoint(user_data_dir, timeout=1.0):
+    """
+    Devuelve el endpoint CDP del navegador abierto con este perfil, o None.
+    Una entrada que ya no responde (navegador cerrado sin limpiar) se borra.
+    """
+    with _registry_lock:
+        entry = _load().get(_key(user_data_dir))
+    if entry is None:
+        return None
+    endpoint = entry["endpoint"]
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=timeout) as response:
+            json.load(response)
+        return endpoint
+    except (OSError, ValueError):
+        unregister_endpoint(user_data_dir)
+        return None
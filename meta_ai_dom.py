@@ -0,0 +1,151 @@
+# ComfyUI_MetaAi/meta_ai_dom.py
+import os
+import sys
+import json
+import threading
+from pathlib import Path
+
+SELECTORS_PATH = Path(__file__).parent / "meta_ai_selectors.json"
+
+# Estrategias por fase, en el orden por defecto (sin historial)
+IMAGE_STRATEGIES = {
+    "alt_generated": 'img[alt="Media generated by meta.ai"]',
+    "download_media_img": 'div[aria-label="Download media"] img',
+    "fbcdn_src": 'img[src*="scontent.feze8-2.fna.fbcdn.net"]',
+}
+RATIO_LABELS = ["1:1", "16:9", "9:16", "4:3", "3:4"]
+
+# Una sola ida y vuelta: prueba las estrategias de imágenes en el orden pedido
+# y devuelve además los botones de aspect ratio (presencia, visibilidad y si
+# están seleccionados: tienen un svg relleno) y los botones "Download media".
+_HARVEST_JS = """
+({ strategies, minImages, ratioLabels }) => {
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const images = { strategy: null, srcs: [], tried: [] };
+    for (const [name, selector] of strategies) {
+        const srcs = Array.from(document.querySelectorAll(selector))
+            .map(el => (el.getAttribute('src') || '').trim())
+            .filter(Boolean);
+        images.tried.push([name, srcs.length]);
+        if (srcs.length > images.srcs.length) {
+            images.srcs = srcs;
+            images.strategy = name;
+        }
+        if (srcs.length >= minImages) break;
+    }
+    const ratios = {};
+    for (const label of ratioLabels) {
+        const el = document.querySelector(`div[aria-label="${label}"]`);
+        ratios[label] = el ? {
+            visible: visible(el),
+            selected: !!el.querySelector('svg:not([fill="none"])'),
+        } : null;
+    }
+    return {
+        images,
+        ratios,
+        downloadButtons: document.querySelectorAll('div[aria-label="Download media"]').length,
+    };
+}
+"""
+
+
+class SelectorTable:
+    """
+    Historial persistente de qué estrategia de búsqueda funciona en cada fase.
+
+    Cada éxito suma a la puntuación de la estrategia y todas se atenúan con
+    el tiempo, así que la que funcionó la última vez se prueba primero y las
+    que fallan una y otra vez (cambios en el HTML de Meta AI) quedan al final
+    sin desaparecer del todo.
+    """
+
+    def __init__(self, path=SELECTORS_PATH, decay=0.8):
+        self.path = Path(path)
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._table = self._load()
+
+    def order(self, phase, names):
+        """`names` ordenados de mejor a peor según el historial (el orden dado desempata)."""
+        with self._lock:
+            scores = self._table.get(phase, {})
+            ranked = sorted(enumerate(names), key=lambda item: (-scores.get(item[1], {}).get("score", 0.0), item[0]))
+        return [name for _, name in ranked]
+
+    def record(self, phase, winner, tried=()):
+        """Anota el éxito de `winner` (None si ninguna sirvió) y el fallo de las demás probadas."""
+        with self._lock:
+            stats = self._table.setdefault(phase, {})
+            for name in set(tried) | ({winner} if winner else set()):
+                entry = stats.setdefault(name, {"score": 0.0, "ok": 0, "failed": 0})
+                entry["score"] = entry["score"] * self.decay + (1.0 if name == winner else 0.0)
+                entry["ok" if name == winner else "failed"] += 1
+            self._save()
+
+    def report(self):
+        with self._lock:
+            return json.loads(json.dumps(self._table))
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARN] Tabla de selectores ilegible, se reinicia: {e}", file=sys.stderr)
+            return {}
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._table, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class DomHarvester:
+    """Lee de la página todo lo que necesita una fase con un único page.evaluate."""
+
+    def __init__(self, page, table=None):
+        self.page = page
+        self.table = table or get_selector_table()
+
+    async def harvest(self, min_images=4):
+        names = self.table.order("images", list(IMAGE_STRATEGIES))
+        return await self.page.evaluate(_HARVEST_JS, {
+            "strategies": [[name, IMAGE_STRATEGIES[name]] for name in names],
+            "minImages": min_images,
+            "ratioLabels": RATIO_LABELS,
+        })
+
+    async def image_sources(self, min_images=4):
+        """URLs de las imágenes generadas con la mejor estrategia; anota el resultado en la tabla."""
+        state = await self.harvest(min_images)
+        images = state["images"]
+        for name, count in images["tried"]:
+            print(f"[DEBUG] Encontradas {count} imágenes con selector: {IMAGE_STRATEGIES[name]}")
+        winner = images["strategy"] if len(images["srcs"]) >= min_images else None
+        self.table.record("images", winner, [name for name, _ in images["tried"]])
+        return images["srcs"]
+
+    def ratio_openers(self, state, aspect_ratio):
+        """Botones visibles que pueden abrir el menú de aspect ratio, los que funcionaron antes primero."""
+        visible = [label for label, info in state["ratios"].items() if info and info["visible"]]
+        return self.table.order(f"ratio_opener:{aspect_ratio}", visible)
+
+    def record_ratio_opener(self, aspect_ratio, winner, tried):
+        self.table.record(f"ratio_opener:{aspect_ratio}", winner, tried)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_selector_table():
+    """Devuelve la tabla de selectores compartida del proceso."""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = SelectorTable()
+        return _table
@@ -0,0 +1,314 @@
+# ComfyUI_MetaAi/meta_ai_download.py
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+
+
+class IntegrityError(RuntimeError):
+    """El archivo descargado no coincide con lo anunciado (tamaño, checksum o recurso cambiado)."""
+
+
+class AsyncDownloader:
+    """
+    Descargas HTTP que no bloquean el event loop.
+
+    Una única `requests.Session` (pool de conexiones keep-alive) se usa desde
+    un pool de hilos propio; las corrutinas solo esperan el resultado.
+
+    En modo segmentado (videos) se consulta antes el tamaño con HEAD y, si el
+    servidor acepta rangos, el archivo se parte en segmentos que se descargan
+    en paralelo sobre un `.part` del tamaño final; el progreso de cada
+    segmento se guarda en `.part.json`, de modo que un corte de red solo
+    repite lo que faltaba (también entre llamadas: si se agotan los
+    reintentos el `.part` se conserva mientras el recurso no cambie según su
+    ETag/Last-Modified). Las descargas pequeñas (imágenes) se hacen con un
+    único GET, sin la ida y vuelta del HEAD.
+    Al terminar se comprueban el tamaño y, si el servidor lo anuncia, el
+    checksum (Digest / Content-MD5) o el `expected_sha256` pedido, y el
+    `.part` se renombra de forma atómica al destino. Errores de red y 5xx se
+    reintentan con backoff exponencial.
+    """
+
+    def __init__(self, max_workers=8, timeout=30, retries=3, backoff=1.0, chunk_size=256 * 1024,
+                 max_parallel=4, min_segment=2 * 1024 * 1024, max_chunk=4 * 1024 * 1024):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+        self.max_parallel = max_parallel
+        self.min_segment = min_segment
+        self.max_chunk = max_chunk
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MetaAiDownload")
+        # Los segmentos usan su propio pool: esperar desde el pool principal no puede bloquearlo
+        self._segment_executor = ThreadPoolExecutor(
+            max_workers=max_workers * max_parallel, thread_name_prefix="MetaAiSegment"
+        )
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers * (max_parallel + 1))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    async def download(self, url, dest, headers=None, timeout=None, expected_sha256=None, segmented=True):
+        """
+        Descarga `url` en `dest` y devuelve la ruta final. Con `segmented=False`
+        (archivos pequeños) no hay HEAD previo ni rangos.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._download_blocking, url, Path(dest), headers,
+            timeout or self.timeout, expected_sha256, segmented
+        )
+
+    async def download_many(self, items, headers=None, timeout=None, segmented=False):
+        """
+        Descarga en paralelo una lista de (url, destino). Devuelve una lista en el
+        mismo orden con la ruta o la excepción de cada elemento.
+        """
+        return await asyncio.gather(
+            *(self.download(url, dest, headers, timeout, segmented=segmented) for url, dest in items),
+            return_exceptions=True,
+        )
+
+    def discard_partial(self, dest):
+        """
+        Borra el `.part` y su `.part.json` de `dest`. Para quien no va a volver a
+        pedir el mismo destino (p. ej. un nodo que numera cada salida de nuevo).
+        """
+        dest = Path(dest)
+        self._discard(dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json"))
+
+    def _download_blocking(self, url, dest, headers, timeout, expected_sha256=None, segmented=True):
+        merged_headers = {**DEFAULT_HEADERS, **(headers or {})}
+        part_path = dest.with_name(dest.name + ".part")
+        state_path = dest.with_name(dest.name + ".part.json")
+        use_ranges = segmented
+        last_error = None
+        resumable = False
+        for attempt in range(self.retries + 1):
+            try:
+                info = self._fetch(url, part_path, state_path, merged_headers, timeout, use_ranges)
+                self._verify(part_path, info, expected_sha256)
+                os.replace(part_path, dest)
+                self._discard(state_path)
+                return dest
+            except IntegrityError as e:
+                # Datos inservibles: se empieza de cero y sin rangos
+                last_error = e
+                use_ranges = False
+                resumable = False
+                self._discard(part_path, state_path)
+            except requests.HTTPError as e:
+                last_error = e
+                # Los 4xx no se arreglan reintentando
+                if e.response is not None and e.response.status_code < 500:
+                    resumable = False
+                    break
+                resumable = state_path.exists()
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                # El progreso guardado se conserva: el reintento solo pide lo que falta
+                last_error = e
+                resumable = state_path.exists()
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt)
+                print(f"[WARN] Descarga fallida ({last_error}); reintento {attempt + 1} en {delay:.1f}s", file=sys.stderr)
+                time.sleep(delay)
+
+        if resumable:
+            # Fallo de red con segmentos ya escritos: la próxima llamada continúa desde ahí
+            print(f"[INFO] Descarga parcial conservada en {part_path.name} para reanudarla")
+        else:
+            self._discard(part_path, state_path)
+        raise RuntimeError(f"No se pudo descargar {url[:100]}: {last_error}")
+
+    # --- Descarga ---
+
+    @staticmethod
+    def _parse_info(headers=None):
+        """Tamaño, soporte de rangos, validador (ETag/Last-Modified) y checksum anunciado."""
+        info = {"length": None, "ranges": False, "validator": None, "digest": None, "content_md5": None}
+        if headers is None:
+            return info
+        length = headers.get("Content-Length")
+        info["length"] = int(length) if length and length.isdigit() else None
+        info["ranges"] = headers.get("Accept-Ranges", "").lower() == "bytes"
+        etag = headers.get("ETag")
+        # Un ETag débil no garantiza bytes idénticos entre rangos
+        info["validator"] = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+        info["digest"] = headers.get("Digest")
+        info["content_md5"] = headers.get("Content-MD5")
+        return info
+
+    def _probe(self, url, headers, timeout):
+        try:
+            response = self._session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        except (requests.ConnectionError, requests.Timeout):
+            return self._parse_info()
+        return self._parse_info(response.headers if response.status_code < 400 else None)
+
+    def _chunk_for(self, length):
+        # Trozos más grandes para archivos grandes: menos llamadas y escrituras
+        if not length:
+            return self.chunk_size
+        return max(self.chunk_size, min(self.max_chunk, (length // 32) // 65536 * 65536))
+
+    def _fetch(self, url, part_path, state_path, headers, timeout, use_ranges):
+        if not use_ranges:
+            # Sin HEAD: tamaño y checksum salen de la propia respuesta
+            return self._fetch_whole(url, part_path, headers, timeout)
+        info = self._probe(url, headers, timeout)
+        length = info["length"]
+        if not (info["ranges"] and length):
+            return self._fetch_whole(url, part_path, headers, timeout)
+
+        state = self._load_state(state_path, info)
+        if state is None or not part_path.exists() or part_path.stat().st_size != length:
+            # Nuevo archivo del tamaño final: cada segmento escribe en su posición
+            with open(part_path, "wb") as f:
+                f.truncate(length)
+            state = {"length": length, "validator": info["validator"], "done": {}}
+
+        parts = max(1, min(self.max_parallel, -(-length // self.min_segment)))
+        size = -(-length // parts)
+        segments = [(start, min(length, start + size) - 1) for start in range(0, length, size)]
+        lock = threading.Lock()
+
+        def save():
+            with lock:
+                with open(state_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+
+        def fetch(segment):
+            start, end = segment
+            try:
+                self._fetch_range(url, part_path, start, end, headers, timeout, info, state["done"], lock)
+            finally:
+                save()
+
+        pending = [seg for seg in segments if state["done"].get(str(seg[0]), 0) < seg[1] - seg[0] + 1]
+        if len(pending) < len(segments):
+            print(f"[INFO] Reanudando descarga: faltan {len(pending)} de {len(segments)} segmentos")
+        futures = [self._segment_executor.submit(fetch, seg) for seg in pending]
+        errors = [future.exception() for future in futures]
+        errors = [e for e in errors if e is not None]
+        if errors:
+            # Se esperan todos los segmentos antes de fallar para no perder su progreso
+            raise errors[0]
+        return info
+
+    def _fetch_range(self, url, part_path, start, end, headers, timeout, info, done, lock):
+        key = str(start)
+        with lock:
+            written = done.get(key, 0)
+        range_headers = {**headers, "Range": f"bytes={start + written}-{end}"}
+        if info["validator"]:
+            # Si el recurso cambió, el servidor responde 200 con el archivo entero
+            range_headers["If-Range"] = info["validator"]
+        with self._session.get(url, headers=range_headers, stream=True, timeout=timeout) as response:
+            if response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            if response.status_code in (200, 416):
+                raise IntegrityError(f"Rango {start}-{end} rechazado (HTTP {response.status_code})")
+            response.raise_for_status()
+            # Sin checksum (fbcdn no manda Digest) un rango desplazado pasaría la comprobación de tamaño
+            content_range = response.headers.get("Content-Range", "")
+            expected = f"bytes {start + written}-{end}/"
+            if not content_range.startswith(expected) or content_range[len(expected):] not in ("*", str(info["length"])):
+                raise IntegrityError(f"Content-Range '{content_range}' no corresponde al rango pedido {start + written}-{end}")
+            with open(part_path, "r+b") as f:
+                f.seek(start + written)
+                for chunk in response.iter_content(self._chunk_for(end - start + 1)):
+                    f.write(chunk)
+                    written += len(chunk)
+                    with lock:
+                        done[key] = written
+        if start + written != end + 1:
+            raise requests.ConnectionError(f"Rango {start}-{end} incompleto ({written} bytes)")
+
+    def _fetch_whole(self, url, part_path, headers, timeout):
+        with self._session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            response.raise_for_status()
+            info = self._parse_info(response.headers)
+            if response.headers.get("Content-Encoding", "identity") != "identity":
+                # requests descomprime: Content-Length y checksum se refieren a los bytes comprimidos
+                info.update(length=None, digest=None, content_md5=None)
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(self._chunk_for(info["length"])):
+                    f.write(chunk)
+        return info
+
+    # --- Integridad ---
+
+    @staticmethod
+    def _load_state(state_path, info):
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Sin validador no hay forma de saber si el recurso cambió: no se reanuda
+        if not info["validator"] or state.get("validator") != info["validator"] or state.get("length") != info["length"]:
+            return None
+        return state
+
+    @staticmethod
+    def _verify(part_path, info, expected_sha256):
+        size = part_path.stat().st_size
+        if info["length"] is not None and size != info["length"]:
+            raise IntegrityError(f"Tamaño {size} distinto del anunciado {info['length']}")
+
+        # Digest: sha-256=<base64>,md5=<base64>  /  Content-MD5: <base64>
+        announced = {}
+        for item in (info["digest"] or "").split(","):
+            algorithm, _, value = item.strip().partition("=")
+            if value and algorithm.lower() in ("sha-256", "md5"):
+                announced[algorithm.lower().replace("-", "")] = value.strip()
+        if info["content_md5"]:
+            announced.setdefault("md5", info["content_md5"].strip())
+        if not announced and not expected_sha256:
+            return
+
+        hashes = {"sha256": hashlib.sha256(), "md5": hashlib.md5()}
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                for h in hashes.values():
+                    h.update(block)
+        if expected_sha256 and hashes["sha256"].hexdigest() != expected_sha256.lower():
+            raise IntegrityError("SHA-256 distinto del esperado")
+        for algorithm, value in announced.items():
+            if base64.b64encode(hashes[algorithm].digest()).decode() != value:
+                raise IntegrityError(f"Checksum {algorithm} distinto del anunciado por el servidor")
+
+    @staticmethod
+    def _discard(*paths):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader():
+    """Devuelve el descargador compartido del proceso."""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = AsyncDownloader()
+        return _downloader
@@ -0,0 +1,159 @@
+# ComfyUI_MetaAi/meta_ai_ffmpeg.py
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Destino de instalar_ffmpeg.bat, por si el PATH de ComfyUI no lo incluye
+WINDOWS_FFMPEG = r"C:\ffmpeg\bin\ffmpeg.exe"
+
+# preset -> (extensión, argumentos de salida); los nombres son los de TRANSCODE_PRESETS
+PRESETS = {
+    "h264_web": (".mp4", [
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart",
+    ]),
+    "h264_small": (".mp4", [
+        "-vf", "scale=-2:'min(720,ih)'", "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart",
+    ]),
+    "vp9_webm": (".webm", ["-c:v", "libvpx-vp9", "-crf", "34", "-b:v", "0", "-row-mt", "1", "-c:a", "libopus"]),
+    "prores_edit": (".mov", ["-c:v", "prores_ks", "-profile:v", "2", "-pix_fmt", "yuv422p10le", "-c:a", "pcm_s16le"]),
+}
+
+
+def find_ffmpeg():
+    """Ruta de ffmpeg: META_AI_FFMPEG, el PATH o la carpeta de instalar_ffmpeg.bat."""
+    for candidate in (os.environ.get("META_AI_FFMPEG"), shutil.which("ffmpeg"), WINDOWS_FFMPEG):
+        if candidate and Path(candidate).is_file():
+            return str(candidate)
+    return None
+
+
+class PostProcessor:
+    """
+    Posprocesado de videos con ffmpeg fuera del event loop.
+
+    Cada video encolado pasa por los pasos pedidos (remux con faststart por
+    copia de streams, miniatura, vista previa animada y transcodificación a un
+    preset) en un pool acotado: como mucho `max_workers` procesos ffmpeg a la
+    vez. Los nodos encolan cada video en cuanto se descarga, así el
+    posprocesado se solapa con las siguientes generaciones. Un paso que falla
+    se informa y no impide los demás.
+    """
+
+    def __init__(self, max_workers=2, timeout=600):
+        self.ffmpeg = find_ffmpeg()
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MetaAiFfmpeg")
+        self._warned = False
+
+    @property
+    def available(self):
+        return self.ffmpeg is not None
+
+    def submit(self, video_path, faststart=False, thumbnail=False, preview=False, preset="none"):
+        """
+        Encola el posprocesado de un video. Devuelve un concurrent.futures.Future
+        con {"thumbnail": ruta, "preview": ruta, "transcode": ruta} (solo los
+        pasos que salieron bien) o None si no hay nada que hacer.
+        """
+        if not (faststart or thumbnail or preview or preset != "none"):
+            return None
+        if not self._check():
+            return None
+        return self._executor.submit(self._process, Path(video_path), faststart, thumbnail, preview, preset)
+
+    def submit_concat(self, video_paths, dest):
+        """Encola la unión de varios videos en `dest`. El Future devuelve la ruta o lanza RuntimeError."""
+        if not self._check():
+            return None
+        return self._executor.submit(self._concat, [Path(p) for p in video_paths], Path(dest))
+
+    def _check(self):
+        if self.ffmpeg is None and not self._warned:
+            self._warned = True
+            print("[WARN] ffmpeg no encontrado (ver instalar_ffmpeg.bat); se omite el posprocesado de videos", file=sys.stderr)
+        return self.ffmpeg is not None
+
+    def _run(self, args):
+        command = [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-y", *args]
+        # Sin ventana de consola por cada proceso en Windows
+        flags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+        result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout, creationflags=flags)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg terminó con código {result.returncode}: {result.stderr.strip()[-300:]}")
+
+    def _write(self, dest, args):
+        # Se escribe a un temporal con la misma extensión (ffmpeg deduce el formato) y se renombra
+        tmp = dest.with_name(f"{dest.stem}.tmp{dest.suffix}")
+        try:
+            self._run([*args, str(tmp)])
+            os.replace(tmp, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return dest
+
+    def _process(self, video, faststart, thumbnail, preview, preset):
+        source = ["-i", str(video)]
+        steps = []
+        if faststart:
+            # moov al principio: el video empieza a reproducirse antes de descargarse entero
+            steps.append(("faststart", video, source + ["-map", "0:v", "-map", "0:a?", "-c", "copy", "-movflags", "+faststart"]))
+        if thumbnail:
+            steps.append(("thumbnail", video.with_suffix(".jpg"),
+                          source + ["-vf", "thumbnail,scale=512:-2", "-frames:v", "1", "-update", "1", "-q:v", "3"]))
+        if preview:
+            steps.append(("preview", video.with_name(f"{video.stem}_preview.webp"),
+                          source + ["-t", "6", "-vf", "fps=8,scale=256:-2", "-an", "-c:v", "libwebp",
+                                    "-quality", "70", "-loop", "0"]))
+        if preset != "none":
+            suffix, args = PRESETS[preset]
+            steps.append(("transcode", video.with_name(f"{video.stem}_{preset}{suffix}"), source + args))
+
+        outputs = {}
+        for name, dest, args in steps:
+            try:
+                self._write(dest, args)
+                if name != "faststart":
+                    outputs[name] = str(dest)
+            except Exception as e:
+                print(f"[WARN] Posprocesado '{name}' de {video.name} fallido: {e}", file=sys.stderr)
+        return outputs
+
+    def _concat(self, videos, dest):
+        fd, list_path = tempfile.mkstemp(suffix=".txt", prefix="meta_ai_concat_")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for video in videos:
+                escaped = str(video.resolve()).replace("\\", "/").replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        source = ["-f", "concat", "-safe", "0", "-i", list_path]
+        try:
+            try:
+                # Los clips de Meta AI suelen compartir códec y resolución: basta con copiar
+                return str(self._write(dest, source + ["-c", "copy", "-movflags", "+faststart"]))
+            except RuntimeError as e:
+                print(f"[WARN] Unión por copia fallida, se recodifica: {e}", file=sys.stderr)
+                return str(self._write(dest, source + [
+                    "-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p",
+                    "-c:a", "aac", "-movflags", "+faststart",
+                ]))
+        finally:
+            os.unlink(list_path)
+
+
+_post_processor = None
+_post_processor_lock = threading.Lock()
+
+
+def get_post_processor():
+    """Devuelve el posprocesador compartido del proceso."""
+    global _post_processor
+    with _post_processor_lock:
+        if _post_processor is None:
+            _post_processor = PostProcessor()
+        return _post_processor
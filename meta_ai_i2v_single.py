@@ -2,294 +2,425 @@
 import os
 import sys
 import time
-import glob
-import cv2
-import re
 import numpy as np
+import torch
 from pathlib import Path
-from PIL import Image
-import requests
 import asyncio
+import functools
 import traceback
 import json
-
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-
-class MetaAiSingleVideoGenerator:
+import tempfile
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .meta_ai_browser_pool import get_browser_pool, BrowserOptions, META_AI_MEDIA_URL
+from .meta_ai_profiles import get_profile_manager
+from .meta_ai_scheduler import run_bounded, profile_dirs, get_profile_scheduler
+from .meta_ai_cache import get_result_cache, get_single_flight, link_or_copy
+from .meta_ai_capture import MediaCapture
+from .meta_ai_download import get_downloader
+from .meta_ai_ffmpeg import get_post_processor
+from .meta_ai_watcher import PageWatcher
+from .meta_ai_media import encode_upload_payload, decode_video_frames
+from .meta_ai_catalog import get_catalog
+from .meta_ai_janitor import get_chat_janitor
+from .meta_ai_metrics import JobTrace
+from .meta_ai_options import DEFAULT_BLOCKED_HOSTS
+from .meta_ai_shells import MetaAiSingleVideoGeneratorShell
+
+# Salida de frames cuando no se piden o el video falló
+EMPTY_FRAMES = torch.zeros((1, 64, 64, 3), dtype=torch.float32)
+
+class MetaAiSingleVideoGenerator(MetaAiSingleVideoGeneratorShell):
     def __init__(self):
         # Directorio de salida en la carpeta principal de ComfyUI
         self.output_dir = Path(__file__).parent.parent.parent / "output" / "meta_ai"
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    @classmethod
-    def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "image": ("IMAGE",),  # Entrada de imagen de ComfyUI
-                "prompt": ("STRING", {"multiline": True, "default": ""}),
-                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),
-                "namevideo": ("STRING", {"default": ""}),
-                "force_generation": ("BOOLEAN", {"default": False}),  # Para forzar generación
-            }
-        }
-
-    RETURN_TYPES = ("VIDEO",)
-    RETURN_NAMES = ("video_path",)
-    FUNCTION = "generate_video"
-    CATEGORY = "MetaAI"
-
-    async def generate_video(self, image, prompt, profile_name, namevideo, force_generation):
+    async def generate_video(self, image, prompt, profile_name, namevideo, force_generation,
+                             batch_pairing="single", max_concurrency=2, upload_format="png_fast", upload_quality=92,
+                             return_frames=False, frame_stride=1, max_frames=0, frame_width=0, frame_height=0,
+                             frames_mmap=False, retention_keep_last=0, retention_max_age_days=0, retention_max_gb=0.0,
+                             chat_cleanup="per_job", cleanup_every_n=5,
+                             browser_mode="visible", block_resources=False, blocked_resource_types="",
+                             blocked_hosts=DEFAULT_BLOCKED_HOSTS, profile_strategy="round_robin",
+                             profile_concurrency=2, profile_rate_per_min=0.0, adaptive_concurrency=True,
+                             profile_clones=0, faststart=False, thumbnail=False, preview=False,
+                             transcode_preset="none", concat_batch=False):
         """
-        Genera un video usando Meta AI a partir de una imagen y un prompt.
+        Genera videos usando Meta AI a partir de imágenes y prompts.
+
+        batch_pairing decide qué pares (imagen, prompt) se animan:
+        "single" solo la primera imagen con el primer prompt, "zip" la imagen i
+        con el prompt i y "cartesian" todas las combinaciones. Devuelve la lista
+        de rutas en el orden de los pares (None donde la generación falló) y,
+        con return_frames, los frames decodificados de cada video. Con varios
+        perfiles en profile_name los pares se reparten entre esas cuentas.
+
+        Cada video se encola en el posprocesado con ffmpeg (faststart,
+        miniatura, vista previa, preset) en cuanto se descarga; el nodo solo
+        lo espera si necesita los videos terminados (return_frames o
+        concat_batch) y si no los derivados se catalogan al acabar. Con
+        concat_batch los videos del batch se unen en uno que se añade al
+        final de la lista.
         """
         # Aseguramos que el nombre del perfil no esté vacío
         profile_name = profile_name.strip() or "meta_playwright_profile3"
-        
-        # Directorio fijo para el perfil (dentro del directorio del nodo)
-        user_data_dir = Path(__file__).parent / profile_name
-        user_data_dir.mkdir(parents=True, exist_ok=True)
 
-        # Convertir el tensor de imagen de ComfyUI a PIL Image
-        try:
-            # El tensor tiene forma (batch, height, width, channels)
-            # Tomamos la primera imagen si hay batch
-            if len(image.shape) == 4:
-                img_tensor = image[0]  # Tomar la primera imagen del batch
-            else:
-                img_tensor = image
-            
-            # Convertir de tensor a numpy array y luego a PIL Image
-            np_img = (img_tensor.cpu().numpy() * 255).astype(np.uint8)
-            pil_img = Image.fromarray(np_img, mode="RGB")
-            
-            # Guardar temporalmente como PNG
-            temp_input = self.output_dir / f"input_{int(time.time() * 1000)}.png"
-            pil_img.save(temp_input, "PNG")
-            current_input_path = str(temp_input)
-            
-        except Exception as e:
-            print(f"[ERROR] Error al convertir la imagen: {e}", file=sys.stderr)
-            return (None,)
+        # Directorios fijos de los perfiles (dentro del directorio del nodo)
+        user_data_dirs = profile_dirs(profile_name, Path(__file__).parent)
+        if profile_clones:
+            # Varios navegadores por cuenta: clones ligeros del perfil con la sesión iniciada
+            user_data_dirs = get_profile_manager().expand(user_data_dirs, profile_clones)
+        profiles = get_profile_scheduler()
+        profiles.configure(user_data_dirs, profile_concurrency, profile_rate_per_min, adaptive=adaptive_concurrency)
 
         # Procesar el prompt
         prompt_lines = [line.strip() for line in prompt.strip().split("\n") if line.strip()]
         if not prompt_lines:
             print("[ERROR] Prompt vacío.", file=sys.stderr)
-            return (None,)
+            return ([None], [EMPTY_FRAMES])
 
-        # Tomar solo el primer prompt
-        current_prompt = prompt_lines[0]
+        # El tensor tiene forma (batch, height, width, channels)
+        images = image if len(image.shape) == 4 else image.unsqueeze(0)
+        pairs = self._build_pairs(images.shape[0], len(prompt_lines), batch_pairing)
 
+        # Convertir cada imagen usada a uint8 una sola vez, aunque aparezca en varios pares
+        input_arrays = {}
         try:
-            async with async_playwright() as p:
-                context = await p.chromium.launch_persistent_context(
-                    str(user_data_dir),
-                    headless=False,
-                    locale="en-US",
-                    args=[
-                        "--start-maximized",
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=TranslateUI,msUnifiedAppUIToolbar",
-                        "--no-first-run",
-                        "--no-default-browser-check",
-                        "--disable-infobars",
-                        "--lang=en-US"
-                    ],
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36",
-                    accept_downloads=True,
-                    ignore_default_args=["--enable-automation"],
-                    timeout=30000
+            for img_idx in sorted({img_idx for img_idx, _ in pairs}):
+                input_arrays[img_idx] = self._tensor_to_uint8(images[img_idx])
+        except Exception as e:
+            print(f"[ERROR] Error al convertir la imagen: {e}", file=sys.stderr)
+            return ([None], [EMPTY_FRAMES])
+
+        pool = get_browser_pool()
+        browser_options = BrowserOptions.from_inputs(browser_mode, block_resources, blocked_resource_types, blocked_hosts)
+        cache = get_result_cache()
+        single_flight = get_single_flight()
+        catalog = get_catalog()
+        catalog.set_retention(
+            self.output_dir, max_bytes=int(retention_max_gb * 1024 ** 3),
+            max_age=retention_max_age_days * 86400, keep_last=retention_keep_last
+        )
+        input_payloads = {}
+        job_info = {}
+        post = get_post_processor()
+        post_jobs = {}
+
+        async def run_pair(pair):
+            trace = JobTrace("video", profile=profile_name, mode=browser_mode, upload_format=upload_format)
+            try:
+                video_path = await generate_pair(pair, trace)
+            except Exception as e:
+                trace.finish(JobTrace.classify(e), e)
+                raise
+            trace.finish()
+
+            # Renombrar video si se proporciona un nombre (antes del posprocesado, que usa el nombre final)
+            if namevideo:
+                k = pairs.index(pair)
+                final_name = namevideo if len(pairs) == 1 else f"{namevideo}_{k + 1:03d}"
+                final_video_path = self.output_dir / f"{final_name}.mp4"
+                if final_video_path.exists():
+                    final_video_path.unlink()
+                Path(video_path).rename(final_video_path)
+                video_path = final_video_path
+
+            # ffmpeg trabaja en segundo plano mientras siguen las demás generaciones
+            future = post.submit(video_path, faststart, thumbnail, preview, transcode_preset)
+            if future is not None:
+                post_jobs[pair] = future
+            return video_path
+
+        async def generate_pair(pair, trace):
+            img_idx, prompt_idx = pair
+            np_img = input_arrays[img_idx]
+            started = time.monotonic()
+            cache_key = cache.make_key(
+                "video", prompt_lines[prompt_idx],
+                {"shape": list(np_img.shape), "upload": [upload_format, upload_quality]}, np_img.tobytes()
+            )
+            if not force_generation:
+                with trace.span("cache_lookup"):
+                    cached_paths = cache.get(cache_key)
+                if cached_paths:
+                    trace.labels["cache_hit"] = True
+                    print(f"[INFO] Video recuperado de la caché: {prompt_lines[prompt_idx][:60]}")
+                    video_path = self.output_dir / f"{self.get_next_meta_name()}.mp4"
+                    link_or_copy(cached_paths[0], video_path)
+                    job_info[pair] = (cache_key, {"total_s": time.monotonic() - started, "cached": True})
+                    return video_path
+
+                # Misma imagen y prompt ya en curso: se espera ese video y se copia
+                (leader_path, shared_path), shared = await single_flight.run(
+                    cache_key, lambda: produce_pair(pair, cache_key, trace, started)
+                )
+                video_path = leader_path
+                if shared:
+                    trace.labels["coalesced"] = True
+                    print(f"[INFO] Video compartido con una generación idéntica en curso: {prompt_lines[prompt_idx][:60]}")
+                    # El original puede renombrarse con namevideo: cada nodo recibe su propio archivo
+                    video_path = self.output_dir / f"{self.get_next_meta_name()}.mp4"
+                    try:
+                        link_or_copy(shared_path, video_path)
+                    except FileNotFoundError:
+                        # La copia de la caché ya se expulsó: se usa el archivo del primero
+                        link_or_copy(leader_path, video_path)
+                    job_info[pair] = (cache_key, {"total_s": time.monotonic() - started, "cached": False, "coalesced": True})
+                return video_path
+            video_path, _ = await produce_pair(pair, cache_key, trace, started)
+            return video_path
+
+        async def produce_pair(pair, cache_key, trace, started):
+            img_idx, prompt_idx = pair
+            np_img = input_arrays[img_idx]
+            # La imagen solo se codifica (en memoria) si hace falta subirla
+            if img_idx not in input_payloads:
+                with trace.span("encode_upload"):
+                    input_payloads[img_idx] = encode_upload_payload(
+                        np_img, upload_format, upload_quality, name=f"input_{img_idx}"
+                    )
+
+            async def on_profile(user_data_dir):
+                trace.labels["profile"] = user_data_dir.name
+                # El navegador queda abierto en el pool para los siguientes elementos de la cola
+                video_path = await pool.run(
+                    user_data_dir, self._generate_on_page, input_payloads[img_idx], prompt_lines[prompt_idx],
+                    browser_options=browser_options, trace=trace, job_trace=trace
+                )
+                # Los chats se borran después, en segundo plano (el nodo de video siempre vació la lista)
+                get_chat_janitor().job_finished(user_data_dir, chat_cleanup, cleanup_every_n, delete_all=True)
+                return video_path
+
+            video_path = await profiles.run(user_data_dirs, on_profile, profile_strategy)
+            cached_paths = cache.put(cache_key, [video_path])
+            job_info[pair] = (cache_key, dict(trace.spans, total_s=time.monotonic() - started, cached=False))
+            # Quien espera copia la versión de la caché (estable); si no quedó, el archivo del primero
+            return video_path, cached_paths[0] if cached_paths else video_path
+
+        def record_outputs(video_path, prompt, options, cache_key, future):
+            # Miniaturas, vistas previas y transcodificaciones también entran en la retención
+            try:
+                outputs = future.result()
+            except Exception as e:
+                print(f"[WARN] Posprocesado de {Path(video_path).name} fallido: {e}", file=sys.stderr)
+                return
+            for step, output_path in (outputs or {}).items():
+                catalog.record(output_path, f"video_{step}", prompt, options, cache_key)
+
+        batch_trace = JobTrace("video_batch", profile=profile_name, pairs=len(pairs))
+        with batch_trace.span("jobs"):
+            results = await run_bounded(pairs, run_pair, max_concurrency)
+        if return_frames or concat_batch:
+            # Frames y unión leen los videos ya remuxados: esperar lo que el posprocesado no terminó
+            with batch_trace.span("postprocess_wait"):
+                await asyncio.gather(
+                    *(asyncio.wrap_future(future) for future in post_jobs.values()), return_exceptions=True
                 )
 
-                page = context.pages[0] if context.pages else await context.new_page()
+        video_paths = []
+        held = []
+        for k, result in enumerate(results):
+            if isinstance(result, Exception):
+                print(f"[ERROR] Par {pairs[k]}: {result}", file=sys.stderr)
+                video_paths.append(None)
+                continue
+
+            video_path = result
+            img_idx, prompt_idx = pairs[k]
+            cache_key, timings = job_info[pairs[k]]
+            options = {"image_index": img_idx, "upload_format": upload_format, "upload_quality": upload_quality}
+            # La retención no lo borra mientras este nodo aún lo lee (unión, frames)
+            catalog.record(video_path, "video", prompt_lines[prompt_idx], options, cache_key, timings, in_use=True)
+            held.append(video_path)
+            if pairs[k] in post_jobs:
+                # Si ffmpeg ya terminó se registra ahora; si no, desde su hilo al acabar
+                post_jobs[pairs[k]].add_done_callback(
+                    functools.partial(record_outputs, video_path, prompt_lines[prompt_idx], options, cache_key)
+                )
+            video_paths.append(str(video_path.resolve()).replace("\\", "/"))
 
-                await page.add_init_script("""
-                    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                    Object.defineProperty(document, 'hidden', { value: false });
-                    Object.defineProperty(document, 'visibilityState', { value: 'visible' });
-                    document.dispatchEvent(new Event('visibilitychange'));
-                """)
+        try:
+            generated = [path for path in video_paths if path is not None]
+            if concat_batch and len(generated) > 1:
+                concat_path = self.output_dir / f"{namevideo or self.get_next_meta_name()}_concat.mp4"
+                future = post.submit_concat(generated, concat_path)
+                if future is not None:
+                    try:
+                        with batch_trace.span("concat"):
+                            await asyncio.wrap_future(future)
+                        catalog.record(concat_path, "video_concat", "\n".join(prompt_lines))
+                        video_paths.append(str(concat_path.resolve()).replace("\\", "/"))
+                    except Exception as e:
+                        print(f"[ERROR] No se pudieron unir los videos: {e}", file=sys.stderr)
 
-                # Navegar a la página y seleccionar video
-                await page.goto("https://www.meta.ai/media  ", timeout=60000)
+            frames = []
+            for video_path in video_paths:
+                if not return_frames or video_path is None:
+                    frames.append(EMPTY_FRAMES)
+                    continue
                 try:
-                    await page.wait_for_selector('text="Image"', timeout=30000)
-                    await page.click('text="Image"')
-                    await asyncio.sleep(1)
-                    await page.wait_for_selector('text="Video"', timeout=15000)
-                    await page.click('text="Video"')
-                    await asyncio.sleep(1)
+                    # Decodificación en un hilo para no bloquear el event loop
+                    with batch_trace.span("tensor_conversion"):
+                        frames.append(await asyncio.to_thread(
+                            decode_video_frames, video_path, frame_stride, max_frames,
+                            frame_width, frame_height, frames_mmap
+                        ))
                 except Exception as e:
-                    print(f"[WARN] Navegación inicial inestable: {e}", file=sys.stderr)
-
-                # Subir imagen
+                    print(f"[ERROR] Error decodificando frames de {video_path}: {e}", file=sys.stderr)
+                    frames.append(EMPTY_FRAMES)
+        finally:
+            # Unión y frames ya leyeron los videos: vuelven a la retención
+            catalog.release(held)
+
+        if any(path is not None for path in video_paths):
+            batch_trace.finish()
+        else:
+            batch_trace.finish("error", "ningún video generado")
+        # Devolver los paths de los videos
+        return (video_paths, frames)
+
+    @staticmethod
+    def _build_pairs(num_images, num_prompts, batch_pairing):
+        """Devuelve la lista ordenada de pares (índice de imagen, índice de prompt)."""
+        if batch_pairing == "cartesian":
+            return [(i, j) for i in range(num_images) for j in range(num_prompts)]
+        if batch_pairing == "zip":
+            # La lista más corta repite su último elemento
+            total = max(num_images, num_prompts)
+            return [(min(k, num_images - 1), min(k, num_prompts - 1)) for k in range(total)]
+        return [(0, 0)]
+
+    @staticmethod
+    def _tensor_to_uint8(img_tensor):
+        # Convertir de tensor a numpy array
+        return (img_tensor.cpu().numpy() * 255).astype(np.uint8)
+
+    async def _generate_on_page(self, page, input_payload, current_prompt, job_trace=None):
+        """
+        Ejecuta una generación de video en una pestaña del pool y devuelve la ruta del MP4.
+        """
+        trace = job_trace or JobTrace("video")
+        temp_files = []
+        try:
+            # Si el navegador recibe el MP4 completo (200, no por rangos) se reutilizan esos bytes
+            async with MediaCapture(page, ("video/",)) as capture:
+                return await self._run_generation(page, capture, trace, input_payload, current_prompt, temp_files)
+        finally:
+            for temp_path in temp_files:
                 try:
-                    await page.wait_for_selector('text="Upload image"', timeout=15000)
-                    async with page.expect_file_chooser() as fc_info:
-                        await page.click('text="Upload image"')
-                    file_chooser = await fc_info.value
-                    await file_chooser.set_files(current_input_path)
-                    await asyncio.sleep(2)
-                except Exception:
-                    # Intento fallback
-                    try:
-                        await page.set_input_files('input[type="file"]', current_input_path)
-                    except Exception as e:
-                        raise RuntimeError(f"Falló subida de imagen: {e}")
-
-                # Prompt
-                prompt_container_selector = 'div[contenteditable="true"][role="textbox"]'
-                await page.wait_for_selector(prompt_container_selector, timeout=15000)
-                await page.click(prompt_container_selector)
-                await page.keyboard.press("Control+a")
-                await page.keyboard.press("Delete")
-                await asyncio.sleep(0.3)
-                await page.fill(prompt_container_selector, current_prompt)
-                await asyncio.sleep(0.5)
-
-                # Botón Animate
-                animar_selector = 'div[role="button"]:has-text("Animate")'
-                clicked = False
-                for _ in range(180):  # ~90s
-                    btn = await page.query_selector(animar_selector)
-                    if btn:
-                        tabindex = await btn.get_attribute("tabindex")
-                        aria_disabled = await btn.get_attribute("aria-disabled")
-                        if tabindex == "0" and aria_disabled != "true":
-                            await btn.click()
-                            clicked = True
-                            break
-                    await asyncio.sleep(0.5)
-
-                if not clicked:
-                    raise TimeoutError("Botón 'Animate' no se activó")
-
-                # Esperar video
-                video_url = await self.wait_for_video_after_overlay_disappears(page, max_wait=150)
-
-                base_name = self.get_next_meta_name()
-                video_path = self.output_dir / f"{base_name}.mp4"
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
 
-                response = requests.get(
-                    video_url,
-                    headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"},
-                    stream=True,
-                    timeout=30
-                )
-                response.raise_for_status()
-                with open(video_path, "wb") as f:
-                    for chunk in response.iter_content(8192):
-                        f.write(chunk)
-
-                # --- Eliminar chat en bucle hasta eliminar todos los chats ---
-                max_attempts = 50  # Limitar intentos para evitar bucles infinitos
-                attempts = 0
-                
-                while attempts < max_attempts:
-                    try:
-                        # Verificar si hay botones de menú disponibles
-                        menu_btn = page.locator('div[aria-label*="More options"]').last
-                        menu_btns_count = await menu_btn.count()
-                        
-                        if menu_btns_count == 0:
-                            print(f"[INFO] No se encontraron más chats para eliminar. Total intentos: {attempts}")
-                            break
-                        
-                        print(f"[INFO] Encontrado chat disponible. Eliminando...")
-                        
-                        # Hacer clic en el botón de menú
-                        await menu_btn.click(force=True)
-                        await asyncio.sleep(1)
-
-                        # Hacer clic en la opción de eliminar chat
-                        delete_opt = page.locator('div[role="menuitem"]:has-text("Delete chat")').first
-                        if not await delete_opt.is_visible():
-                            delete_opt = page.locator('text="Delete chat"').first
-                        if await delete_opt.is_visible():
-                            await delete_opt.click(force=True)
-                            await asyncio.sleep(1)
-
-                            # Confirmar la eliminación
-                            confirm = page.locator('div[aria-label="Delete"]').first
-                            if not await confirm.is_visible():
-                                confirm = page.locator('span:text-is("Delete")').last
-                            if await confirm.is_visible():
-                                await confirm.click(force=True)
-                        
-                        # Esperar un poco para que se complete la eliminación
-                        await page.wait_for_timeout(2000)
-                        
-                        # Volver a verificar si hay más chats después de eliminar
-                        continue  # Continuar con la siguiente iteración del bucle
-                        
-                    except Exception as e:
-                        print(f"[WARN] Error en el proceso de eliminación de chat #{attempts + 1}: {e}", file=sys.stderr)
-                        attempts += 1
-                        continue
-                
-                if attempts >= max_attempts:
-                    print(f"[WARN] Se alcanzó el límite de intentos ({max_attempts}) para eliminar chats.")
-
-                # Cerrar el navegador
-                await context.close()
-
-                # Renombrar video si se proporciona un nombre
-                if namevideo:
-                    final_video_path = self.output_dir / f"{namevideo}.mp4"
-                    if final_video_path.exists():
-                        final_video_path.unlink()
-                    Path(video_path).rename(final_video_path)
-                    video_path = final_video_path
-
-                # Devolver el path del video
-                return (str(video_path.resolve()).replace("\\", "/"),)
+    async def _upload_image(self, page, input_payload, temp_files):
+        """Sube la imagen desde memoria; el archivo temporal es solo el último recurso."""
+        try:
+            await page.wait_for_selector('text="Upload image"', timeout=15000)
+            async with page.expect_file_chooser() as fc_info:
+                await page.click('text="Upload image"')
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(input_payload)
+            await asyncio.sleep(2)
+            return
+        except Exception:
+            pass
 
+        # Intento fallback
+        try:
+            await page.set_input_files('input[type="file"]', input_payload)
+            return
         except Exception as e:
-            print(f"[ERROR] {e}", file=sys.stderr)
-            return (None,)
-
-    def get_next_meta_name(self) -> str:
-        existing = glob.glob(str(self.output_dir / "meta_*.mp4"))
-        numbers = []
-        for f in existing:
-            match = re.search(r"meta_(\d+)", Path(f).stem)
-            if match:
-                numbers.append(int(match.group(1)))
-        next_num = max(numbers) + 1 if numbers else 1
-        return f"meta_{next_num:03d}"
-
-    async def wait_for_video_after_overlay_disappears(self, page, max_wait=150):
-        overlay_selector = 'div[style*="--x-backdropFilter: blur"]'
+            print(f"[WARN] Subida desde memoria fallida, se usa archivo temporal: {e}", file=sys.stderr)
 
+        fd, temp_path = tempfile.mkstemp(prefix="meta_ai_", suffix="_" + input_payload["name"])
+        temp_files.append(temp_path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(input_payload["buffer"])
         try:
-            await page.wait_for_selector(overlay_selector, state="attached", timeout=15000)
-        except:
-            pass
+            await page.set_input_files('input[type="file"]', temp_path)
+        except Exception as e:
+            raise RuntimeError(f"Falló subida de imagen: {e}")
+
+    async def _run_generation(self, page, capture, trace, input_payload, current_prompt, temp_files):
+        # Navegar a la página y seleccionar video
+        with trace.span("goto"):
+            await page.goto(META_AI_MEDIA_URL, timeout=60000)
+            try:
+                await page.wait_for_selector('text="Image"', timeout=30000)
+                await page.click('text="Image"')
+                await asyncio.sleep(1)
+                await page.wait_for_selector('text="Video"', timeout=15000)
+                await page.click('text="Video"')
+                await asyncio.sleep(1)
+            except Exception as e:
+                print(f"[WARN] Navegación inicial inestable: {e}", file=sys.stderr)
+
+        # Subir imagen
+        with trace.span("upload"):
+            await self._upload_image(page, input_payload, temp_files)
+
+        # Prompt
+        with trace.span("prompt"):
+            prompt_container_selector = 'div[contenteditable="true"][role="textbox"]'
+            await page.wait_for_selector(prompt_container_selector, timeout=15000)
+            await page.click(prompt_container_selector)
+            await page.keyboard.press("Control+a")
+            await page.keyboard.press("Delete")
+            await asyncio.sleep(0.3)
+            await page.fill(prompt_container_selector, current_prompt)
+            await asyncio.sleep(0.5)
+
+        # Botón Animate: el observador de la página avisa en cuanto se habilita (~90s máximo)
+        animar_selector = 'div[role="button"]:has-text("Animate")'
+        with trace.span("wait_animate"):
+            try:
+                await PageWatcher(page).wait_for("animate_enabled", 90)
+            except PlaywrightTimeoutError:
+                raise TimeoutError("Botón 'Animate' no se activó")
+        capture.arm()
+        await page.click(animar_selector)
+
+        # Esperar video
+        with trace.span("wait_generation"):
+            try:
+                video_url = await self.wait_for_video_after_overlay_disappears(page, max_wait=150)
+            except RuntimeError:
+                trace.mark("timeout")
+                raise
 
-        try:
-            await page.wait_for_selector(overlay_selector, state="detached", timeout=max_wait * 1000)
-        except:
-            pass
+        base_name = self.get_next_meta_name()
+        video_path = self.output_dir / f"{base_name}.mp4"
 
-        for _ in range(max_wait):
-            video_elements = await page.query_selector_all("video")
-            for video in video_elements:
-                try:
-                    src = await video.get_attribute("src")
-                    if src and isinstance(src, str) and src.strip().startswith("http") and "blob:" not in src:
-                        return src
-                except:
-                    pass
-            await asyncio.sleep(1)
+        try:
+            with trace.span("download"):
+                content = await capture.take(video_url)
+                if content is not None:
+                    with open(video_path, "wb") as f:
+                        f.write(content)
+                else:
+                    # Descarga en un hilo del descargador compartido: el loop sigue atendiendo otras pestañas
+                    await get_downloader().download(video_url, video_path)
+        except BaseException:
+            video_path.unlink(missing_ok=True)
+            # El siguiente intento usa otro nombre y otra URL: la descarga parcial nunca se reanudaría
+            get_downloader().discard_partial(video_path)
+            raise
+
+        return video_path
 
-        raise RuntimeError("No se encontró URL de video descargable.")
+    def get_next_meta_name(self) -> str:
+        # El catálogo reparte el número de forma atómica, sin listar la carpeta en cada llamada
+        return get_catalog().allocate_name(self.output_dir, "meta", ".mp4").stem
 
+    async def wait_for_video_after_overlay_disappears(self, page, max_wait=150):
+        # Se notifica la primera URL http de un <video> nuevo una vez desaparecido el overlay de desenfoque
+        try:
+            return await PageWatcher(page).wait_for("video_url", max_wait)
+        except PlaywrightTimeoutError:
+            raise RuntimeError("No se encontró URL de video descargable.")
 
-# Importar torch si no está disponible
-try:
-    import torch
-except ImportError:
-    import torch
 
 # Registro del nodo
 NODE_CLASS_MAPPINGS = {
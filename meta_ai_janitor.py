@@ -0,0 +1,155 @@
+# ComfyUI_MetaAi/meta_ai_janitor.py
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+from .meta_ai_browser_pool import get_browser_pool, META_AI_MEDIA_URL
+from .meta_ai_metrics import JobTrace
+
+
+class ChatJanitor:
+    """
+    Borra los chats de Meta AI en segundo plano, fuera del camino crítico.
+
+    Los nodos solo avisan con `job_finished()` y devuelven su resultado; el
+    borrado se ejecuta después en una pestaña propia del pool, agrupando
+    todos los chats pendientes en una sola pasada. Nunca corre mientras haya
+    otra generación activa en el mismo perfil (borraría su chat en curso).
+
+    Solo se borran tantos chats como trabajos terminados se anotaron (los
+    creados por los nodos); `delete_all` pide vaciar la lista entera, como
+    hacía el nodo de video.
+
+    Políticas: "per_job" (tras cada trabajo), "every_n" (cada N trabajos),
+    "on_idle" (cuando el perfil lleva `idle_delay` segundos sin trabajos) y "off".
+    """
+
+    def __init__(self, pool, idle_delay=15.0, retry_delay=10.0, max_deletions=50):
+        self.pool = pool
+        self.idle_delay = idle_delay
+        self.retry_delay = retry_delay
+        self.max_deletions = max_deletions
+        self.stats = {"runs": 0, "deleted": 0, "deferred": 0, "errors": 0}
+        self._profiles = {}
+
+    def job_finished(self, user_data_dir, policy="per_job", every_n=5, chats=1, delete_all=False):
+        """Registra un trabajo terminado que creó `chats` chats; se puede llamar desde cualquier hilo."""
+        if policy == "off":
+            return
+        key = str(Path(user_data_dir).resolve())
+        self.pool.submit(self._on_job_finished(key, policy, max(1, int(every_n)), max(0, int(chats)), delete_all))
+
+    def report(self):
+        """Resumen de lo limpiado hasta ahora."""
+        return dict(self.stats)
+
+    async def _on_job_finished(self, key, policy, every_n, chats, delete_all):
+        state = self._profiles.setdefault(
+            key, {"jobs": 0, "chats": 0, "delete_all": False, "pending": False, "last_job": 0.0}
+        )
+        state["jobs"] += 1
+        state["chats"] += chats
+        state["delete_all"] = state["delete_all"] or delete_all
+        state["last_job"] = time.monotonic()
+        if policy == "every_n" and state["jobs"] < every_n:
+            return
+        if not state["pending"]:
+            # Una sola limpieza pendiente por perfil: los avisos siguientes se agrupan en ella
+            state["pending"] = True
+            delay = self.idle_delay if policy == "on_idle" else 0
+            asyncio.get_running_loop().create_task(self._clean_when_possible(key, delay, policy == "on_idle"))
+
+    async def _clean_when_possible(self, key, delay, wait_idle):
+        state = self._profiles[key]
+        trace = JobTrace("chat_cleanup", profile=Path(key).name)
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                idle_for = time.monotonic() - state["last_job"]
+                if wait_idle and idle_for < self.idle_delay:
+                    delay = self.idle_delay - idle_for
+                    continue
+                if self.pool.profile_busy(key) == 0:
+                    # Lo anotado hasta ahora; los trabajos que terminen durante el borrado quedan para la siguiente
+                    limit = self.max_deletions if state["delete_all"] else min(self.max_deletions, state["chats"])
+                    with trace.span("cleanup"):
+                        deleted = await self.pool.run(key, self._delete_chats, limit)
+                    if deleted is not None:
+                        break
+                # Hay generaciones en curso en el perfil: reintentar más tarde
+                self.stats["deferred"] += 1
+                delay = self.retry_delay
+
+            state["jobs"] = 0
+            state["chats"] = max(0, state["chats"] - deleted) if not state["delete_all"] else 0
+            state["delete_all"] = False
+            self.stats["runs"] += 1
+            self.stats["deleted"] += deleted
+            print(f"[INFO] Limpieza de chats: {deleted} eliminados (total {self.stats['deleted']} en {self.stats['runs']} pasadas)")
+            trace.labels["deleted"] = deleted
+            trace.finish()
+        except Exception as e:
+            trace.finish(JobTrace.classify(e), e)
+            self.stats["errors"] += 1
+            print(f"[WARN] Limpieza de chats fallida (no crítico): {e}", file=sys.stderr)
+        finally:
+            state["pending"] = False
+
+    async def _delete_chats(self, page, limit):
+        """Borra hasta `limit` chats (los más recientes); None si otra generación empezó entretanto."""
+        if limit <= 0:
+            return 0
+        if self.pool.concurrent_jobs(page) > 1:
+            return None
+        await page.goto(META_AI_MEDIA_URL, timeout=60000)
+
+        deleted = 0
+        failures = 0
+        while deleted < limit and failures < 3:
+            if self.pool.concurrent_jobs(page) > 1:
+                break
+            try:
+                menu_btn = page.locator('div[aria-label*="More options"]').last
+                if await menu_btn.count() == 0:
+                    break
+
+                await menu_btn.click(force=True)
+                await page.wait_for_timeout(500)
+
+                delete_opt = page.locator('div[role="menuitem"]:has-text("Delete chat")').first
+                if not await delete_opt.is_visible():
+                    delete_opt = page.locator('text="Delete chat"').first
+                if not await delete_opt.is_visible():
+                    failures += 1
+                    await page.keyboard.press("Escape")
+                    continue
+                await delete_opt.click(force=True)
+                await page.wait_for_timeout(500)
+
+                confirm = page.locator('div[aria-label="Delete"]').first
+                if not await confirm.is_visible():
+                    confirm = page.locator('span:text-is("Delete")').last
+                if await confirm.is_visible():
+                    await confirm.click(force=True)
+                    deleted += 1
+                # Esperar a que el chat desaparezca de la lista
+                await page.wait_for_timeout(1000)
+            except Exception as e:
+                failures += 1
+                print(f"[WARN] Error eliminando chat #{deleted + 1}: {e}", file=sys.stderr)
+        return deleted
+
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def get_chat_janitor():
+    """Devuelve el limpiador compartido del proceso."""
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = ChatJanitor(get_browser_pool())
+        return _janitor
@@ -0,0 +1,174 @@
+# ComfyUI_MetaAi/meta_ai_jobs.py
+import sys
+import time
+import uuid
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from .meta_ai_t2i_nodes import MetaAiImageGenerator
+from .meta_ai_i2v_single import MetaAiSingleVideoGenerator, EMPTY_FRAMES
+from .meta_ai_shells import MetaAiSubmitShell, MetaAiCollectShell
+
+
+class JobManager:
+    """
+    Trabajos de generación en segundo plano que sobreviven entre ejecuciones de la cola.
+
+    Cada trabajo corre en un hilo propio con su event loop y usa la lógica de
+    los nodos generadores (y por tanto el pool de navegadores compartido);
+    el nodo Submit devuelve enseguida un identificador y el nodo Collect
+    espera o consulta el resultado. Los trabajos terminados se olvidan pasadas
+    `keep_seconds` (o al recogerlos con `forget`): ComfyUI puede repetir el
+    nodo Collect con el mismo identificador si cambia otra entrada del grafo.
+    """
+
+    def __init__(self, max_workers=4, keep_seconds=3600):
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MetaAiJob")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, kind, kwargs):
+        """Encola un trabajo "image" o "video" y devuelve su identificador."""
+        self._prune()
+        job_id = f"{kind}-{uuid.uuid4().hex[:12]}"
+        entry = {"kind": kind, "submitted": time.time(), "started": None, "finished": None}
+        with self._lock:
+            self._jobs[job_id] = entry
+        entry["future"] = self._executor.submit(self._run, entry, kind, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        self._prune()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """"queued", "running", "done", "failed" o "unknown"."""
+        entry = self.get(job_id)
+        if entry is None:
+            return "unknown"
+        future = entry["future"]
+        if not future.done():
+            return "running" if entry["started"] else "queued"
+        return "failed" if future.exception() is not None else "done"
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _run(self, entry, kind, kwargs):
+        entry["started"] = time.time()
+        try:
+            if kind == "video":
+                node = MetaAiSingleVideoGenerator()
+                return asyncio.run(node.generate_video(**kwargs))
+            node = MetaAiImageGenerator()
+            return asyncio.run(node.generate_images(**kwargs))
+        finally:
+            entry["finished"] = time.time()
+
+    def _prune(self):
+        limit = time.time() - self.keep_seconds
+        with self._lock:
+            for job_id, entry in list(self._jobs.items()):
+                if entry["finished"] and entry["finished"] < limit:
+                    del self._jobs[job_id]
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Devuelve el gestor de trabajos compartido del proceso."""
+    global _jobs
+    with _jobs_lock:
+        if _jobs is None:
+            _jobs = JobManager()
+        return _jobs
+
+
+class MetaAiSubmit(MetaAiSubmitShell):
+    async def submit(self, kind, prompt, profile_name, force_generation, image=None, aspect_ratio="1:1",
+                     timeout=120, batch_mode=False, max_concurrency=2, namevideo="", batch_pairing="single",
+                     return_frames=False, browser_mode="visible", unique_id=None):
+        """Encola la generación y devuelve su identificador sin esperar a Meta AI."""
+        if kind == "video":
+            if image is None:
+                raise ValueError("Un trabajo de video necesita una imagen de entrada")
+            kwargs = dict(
+                image=image, prompt=prompt, profile_name=profile_name, namevideo=namevideo,
+                force_generation=force_generation, batch_pairing=batch_pairing,
+                max_concurrency=max_concurrency, return_frames=return_frames, browser_mode=browser_mode,
+            )
+        else:
+            kwargs = dict(
+                prompt=prompt, timeout=timeout, aspect_ratio=aspect_ratio, force_generation=force_generation,
+                profile_name=profile_name, batch_mode=batch_mode, max_concurrency=max_concurrency,
+                browser_mode=browser_mode,
+            )
+        job_id = get_job_manager().submit(kind, kwargs)
+        # IS_CHANGED mantiene este job_id mientras el gestor lo conserve
+        self._handles.setdefault(unique_id, [0, None])[1] = job_id
+        print(f"[INFO] Trabajo {job_id} encolado")
+        return (job_id,)
+
+
+class MetaAiCollect(MetaAiCollectShell):
+    async def collect(self, job_id, mode="wait", timeout=600, forget=False):
+        """
+        Recoge el resultado de un trabajo. En modo "wait" espera hasta `timeout`
+        segundos; en modo "poll" devuelve enseguida. Si aún no terminó, el
+        estado es "queued"/"running" y las salidas quedan vacías.
+        """
+        empty_images = torch.zeros((1, 64, 64, 3), dtype=torch.float32)
+        empty = (empty_images, [None], [EMPTY_FRAMES])
+        manager = get_job_manager()
+        job_id = job_id.strip()
+        entry = manager.get(job_id)
+        if entry is None:
+            print(f"[ERROR] Trabajo desconocido: {job_id}", file=sys.stderr)
+            return empty + ("unknown",)
+
+        future = entry["future"]
+        if mode == "wait" and not future.done():
+            try:
+                # shield: agotar la espera no cancela el trabajo
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except asyncio.TimeoutError:
+                pass
+            except Exception:
+                pass  # El error se informa abajo a partir del futuro
+
+        status = manager.status(job_id)
+        if status != "done":
+            if status == "failed":
+                print(f"[ERROR] Trabajo {job_id}: {future.exception()}", file=sys.stderr)
+                if forget:
+                    manager.forget(job_id)
+                return empty + (f"failed: {future.exception()}",)
+            return empty + (status,)
+
+        if forget:
+            manager.forget(job_id)
+        result = future.result()
+        if entry["kind"] == "video":
+            video_paths, frames = result
+            return (empty_images, video_paths, frames, "done")
+        images, _ = result
+        return (images, [None], [EMPTY_FRAMES], "done")
+
+
+NODE_CLASS_MAPPINGS = {
+    "MetaAiSubmit": MetaAiSubmit,
+    "MetaAiCollect": MetaAiCollect,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "MetaAiSubmit": "Meta AI Submit Job",
+    "MetaAiCollect": "Meta AI Collect Job",
+}
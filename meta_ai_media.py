@@ -0,0 +1,186 @@
+# ComfyUI_MetaAi/meta_ai_media.py
+import io
+import os
+import sys
+import math
+import mmap
+import weakref
+import tempfile
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+
+def _open_image(source):
+    """Abre (sin decodificar aún) una imagen desde bytes en memoria o desde una ruta."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+
+def decode_image_batch(sources, size_policy="resize"):
+    """
+    Decodifica imágenes (bytes o rutas) a un tensor IMAGE de ComfyUI (B, H, W, 3) float32.
+
+    Todas se escriben en un único tensor uint8 reservado de antemano, que se
+    convierte a float32 una sola vez y se normaliza en el mismo buffer. Con
+    size_policy="resize" las imágenes de otro tamaño se escalan al de la
+    primera; con "pad" se centran sobre negro en el tamaño máximo del lote.
+
+    Devuelve (tensor, índices de `sources` cargados) o (None, []) si no hay ninguna.
+    """
+    opened = []
+    for index, source in enumerate(sources):
+        try:
+            # Image.open solo lee la cabecera: el tamaño se conoce sin decodificar
+            opened.append((index, _open_image(source)))
+        except Exception as e:
+            print(f"[WARN] Error cargando imagen {index}: {e}")
+    if not opened:
+        return None, []
+
+    if size_policy == "pad":
+        width = max(img.size[0] for _, img in opened)
+        height = max(img.size[1] for _, img in opened)
+    else:
+        width, height = opened[0][1].size
+
+    batch = torch.zeros((len(opened), height, width, 3), dtype=torch.uint8)
+    out = batch.numpy()  # comparte memoria con el tensor
+    loaded = []
+    for index, img in opened:
+        try:
+            rgb = img.convert("RGB")
+            if rgb.size != (width, height) and size_policy != "pad":
+                rgb = rgb.resize((width, height), Image.BILINEAR)
+            w, h = rgb.size
+            top = (height - h) // 2
+            left = (width - w) // 2
+            out[len(loaded), top:top + h, left:left + w] = np.asarray(rgb)
+            loaded.append(index)
+        except Exception as e:
+            print(f"[WARN] Error decodificando imagen {index}: {e}", file=sys.stderr)
+        finally:
+            img.close()
+
+    if not loaded:
+        return None, []
+    # Una sola conversión a float32 y normalización in-place
+    return batch[:len(loaded)].to(torch.float32).div_(255.0), loaded
+
+
+def encode_upload_payload(np_img, upload_format="png_fast", quality=90, name="input"):
+    """
+    Codifica un array RGB uint8 en memoria y devuelve el payload de Playwright
+    ({"name", "mimeType", "buffer"}) para `set_files`/`set_input_files`.
+
+    "png_fast" usa compresión PNG nivel 1 (sin pérdida, mucho más rápida que
+    la predeterminada); "jpeg" y "webp" usan `quality`.
+    """
+    pil_img = Image.fromarray(np_img, mode="RGB")
+    buffer = io.BytesIO()
+    if upload_format == "jpeg":
+        pil_img.save(buffer, "JPEG", quality=quality)
+        mime_type, ext = "image/jpeg", "jpg"
+    elif upload_format == "webp":
+        pil_img.save(buffer, "WEBP", quality=quality, method=0)
+        mime_type, ext = "image/webp", "webp"
+    else:
+        pil_img.save(buffer, "PNG", compress_level=1)
+        mime_type, ext = "image/png", "png"
+    return {"name": f"{name}.{ext}", "mimeType": mime_type, "buffer": buffer.getvalue()}
+
+
+def _remove_file(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _allocate_frames(count, height, width, use_mmap):
+    """Reserva el buffer float32 de salida, en RAM o respaldado por un archivo mapeado."""
+    shape = (count, height, width, 3)
+    size = count * height * width * 3 * 4
+    if not use_mmap or size == 0:
+        return np.empty(shape, dtype=np.float32)
+    fd, path = tempfile.mkstemp(prefix="meta_ai_frames_", suffix=".f32")
+    try:
+        os.ftruncate(fd, size)
+        mapping = mmap.mmap(fd, size)
+    except BaseException:
+        os.close(fd)
+        _remove_file(path)
+        raise
+    os.close(fd)
+    if os.name == "nt":
+        # Windows no deja borrar un archivo mapeado: se borra cuando se libera el mapeo
+        # (el tensor y todas sus vistas); lo que siga vivo al salir se intenta borrar entonces
+        weakref.finalize(mapping, _remove_file, path)
+    else:
+        # En POSIX el mapeo sigue siendo válido tras borrar el archivo
+        os.unlink(path)
+    return np.frombuffer(mapping, dtype=np.float32).reshape(shape)
+
+
+def decode_video_frames(path, stride=1, max_frames=0, width=0, height=0, use_mmap=False):
+    """
+    Decodifica un video a un tensor IMAGE (N, H, W, 3) float32 leyendo frame a frame.
+
+    Solo se decodifican los frames que se conservan (`stride`); los demás se
+    saltan con grab(). `max_frames` (0 = sin límite) acota la salida y
+    `width`/`height` (0 = original; si solo se da una, la otra conserva la
+    proporción) la resolución. Cada frame se convierte y normaliza
+    directamente en su hueco del buffer de salida, que con use_mmap=True
+    vive en un archivo temporal mapeado en lugar de en RAM.
+    """
+    stride = max(1, int(stride))
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise RuntimeError(f"No se pudo abrir el video: {path}")
+
+    try:
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        src_w = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_h = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        out_w = width or src_w
+        out_h = height or src_h
+        if src_w and src_h and bool(width) != bool(height):
+            # Solo una dimensión pedida: la otra sigue la proporción del original
+            if width:
+                out_h = max(1, round(src_h * width / src_w))
+            else:
+                out_w = max(1, round(src_w * height / src_h))
+
+        # El número de frames de la cabecera puede ser inexacto: se reserva lo esperado y se recorta
+        expected = math.ceil(total / stride) if total > 0 else (max_frames or 1024)
+        if max_frames:
+            expected = min(expected, max_frames)
+        frames = _allocate_frames(expected, out_h, out_w, use_mmap)
+
+        count = 0
+        index = 0
+        raw = None
+        while count < expected:
+            if not capture.grab():
+                break
+            if index % stride == 0:
+                ok, raw = capture.retrieve(raw)
+                if not ok:
+                    break
+                bgr = raw
+                if (bgr.shape[1], bgr.shape[0]) != (out_w, out_h):
+                    bgr = cv2.resize(bgr, (out_w, out_h), interpolation=cv2.INTER_AREA)
+                slot = frames[count]
+                slot[...] = bgr[..., ::-1]  # BGR -> RGB directamente en float32
+                slot *= 1.0 / 255.0
+                count += 1
+            index += 1
+    finally:
+        capture.release()
+
+    if count == 0:
+        raise RuntimeError(f"El video no contiene frames legibles: {path}")
+    return torch.from_numpy(frames[:count])
@@ -0,0 +1,208 @@
+# ComfyUI_MetaAi/meta_ai_metrics.py
+import sys
+import json
+import math
+import time
+import uuid
+import asyncio
+import threading
+from pathlib import Path
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+
+METRICS_DIR = Path(__file__).parent.parent.parent / "output" / "meta_ai_metrics"
+
+
+class JobTrace:
+    """
+    Tiempos por fase de un trabajo.
+
+    `with trace.span("goto"): ...` acumula la duración de la fase (sirve
+    también alrededor de awaits). `finish()` publica el registro en el
+    MetricsRegistry, que lo añade al JSONL y a las estadísticas agregadas.
+    """
+
+    def __init__(self, node, **labels):
+        self.node = node
+        self.labels = labels
+        self.job_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.spans = {}
+        self.status_hint = None
+        self._t0 = time.monotonic()
+        self._finished = False
+
+    @contextmanager
+    def span(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + (time.monotonic() - start)
+
+    def mark(self, status):
+        """Sugiere el estado final (p. ej. "timeout") aunque el trabajo no lance excepción."""
+        self.status_hint = status
+
+    def finish(self, status="ok", error=None):
+        if self._finished:
+            return
+        self._finished = True
+        if self.status_hint and status in ("ok", "error"):
+            status = self.status_hint
+        get_metrics().record({
+            "job_id": self.job_id,
+            "node": self.node,
+            "labels": self.labels,
+            "started": self.started,
+            "total_s": round(time.monotonic() - self._t0, 4),
+            "status": status,
+            "error": str(error)[:300] if error else None,
+            "phases": {name: round(seconds, 4) for name, seconds in self.spans.items()},
+        })
+
+    @staticmethod
+    def classify(error):
+        """Estado de un trabajo fallido: "timeout" o "error"."""
+        # Cubre TimeoutError, asyncio.TimeoutError y el TimeoutError de Playwright
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(error).__name__.lower():
+            return "timeout"
+        return "error"
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Percentil por rango más cercano
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """
+    Guarda cada trabajo como una línea de jobs.jsonl y mantiene, por nodo y
+    fase, una ventana de las últimas duraciones para calcular p50/p95 y las
+    tasas de éxito y timeout. Exporta un resumen JSON o texto Prometheus.
+    """
+
+    def __init__(self, directory=METRICS_DIR, window=1000):
+        self.directory = Path(directory)
+        self.jsonl_path = self.directory / "jobs.jsonl"
+        self._lock = threading.Lock()
+        self._phases = defaultdict(lambda: deque(maxlen=window))
+        self._status = Counter()
+
+    def record(self, record):
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"[WARN] No se pudo escribir métricas: {e}", file=sys.stderr)
+            node = record["node"]
+            self._status[(node, record["status"])] += 1
+            self._phases[(node, "total")].append(record["total_s"])
+            for phase, seconds in record["phases"].items():
+                self._phases[(node, phase)].append(seconds)
+
+    def summary(self):
+        """Estadísticas agregadas: {nodo: {jobs, success_rate, timeout_rate, phases: {fase: p50/p95}}}."""
+        with self._lock:
+            result = {}
+            for (node, status), count in self._status.items():
+                stats = result.setdefault(node, {"jobs": 0, "by_status": {}, "phases": {}})
+                stats["jobs"] += count
+                stats["by_status"][status] = count
+            for (node, phase), values in self._phases.items():
+                ordered = sorted(values)
+                result.setdefault(node, {"jobs": 0, "by_status": {}, "phases": {}})["phases"][phase] = {
+                    "count": len(ordered),
+                    "p50": round(_percentile(ordered, 0.50), 4),
+                    "p95": round(_percentile(ordered, 0.95), 4),
+                }
+            for stats in result.values():
+                jobs = stats["jobs"] or 1
+                stats["success_rate"] = round(stats["by_status"].get("ok", 0) / jobs, 4)
+                stats["timeout_rate"] = round(stats["by_status"].get("timeout", 0) / jobs, 4)
+            return result
+
+    def prometheus_text(self):
+        """Las mismas estadísticas en formato de texto de Prometheus."""
+        lines = ["# TYPE meta_ai_jobs_total counter"]
+        with self._lock:
+            for (node, status), count in sorted(self._status.items()):
+                lines.append(f'meta_ai_jobs_total{{node="{node}",status="{status}"}} {count}')
+            lines.append("# TYPE meta_ai_phase_seconds summary")
+            for (node, phase), values in sorted(self._phases.items()):
+                ordered = sorted(values)
+                labels = f'node="{node}",phase="{phase}"'
+                for quantile in (0.5, 0.95):
+                    lines.append(f'meta_ai_phase_seconds{{{labels},quantile="{quantile}"}} {_percentile(ordered, quantile):.4f}')
+                lines.append(f"meta_ai_phase_seconds_sum{{{labels}}} {sum(ordered):.4f}")
+                lines.append(f"meta_ai_phase_seconds_count{{{labels}}} {len(ordered)}")
+        return "\n".join(lines) + "\n"
+
+    def write_exports(self):
+        """Escribe summary.json y metrics.prom junto al JSONL; devuelve sus rutas."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        summary_path = self.directory / "summary.json"
+        prom_path = self.directory / "metrics.prom"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        return summary_path, prom_path
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Devuelve el registro de métricas compartido del proceso."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
+
+
+class MetaAiMetricsNode:
+    """Muestra las métricas agregadas de los nodos MetaAI (p50/p95 por fase, tasas de éxito/timeout)."""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "format": (["summary_json", "prometheus"], {"default": "summary_json"}),
+                "write_files": ("BOOLEAN", {"default": False}),  # summary.json y metrics.prom en output/meta_ai_metrics
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("metrics",)
+    FUNCTION = "report"
+    CATEGORY = "MetaAI"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Las métricas cambian entre ejecuciones aunque las entradas no
+        return float("nan")
+
+    def report(self, format, write_files):
+        metrics = get_metrics()
+        if write_files:
+            metrics.write_exports()
+        if format == "prometheus":
+            return (metrics.prometheus_text(),)
+        return (json.dumps(metrics.summary(), indent=2),)
+
+
+NODE_CLASS_MAPPINGS = {
+    "MetaAiMetricsNode": MetaAiMetricsNode
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "MetaAiMetricsNode": "Meta AI Metrics"
+}
@@ -1,32 +1,20 @@
 # ComfyUI_MetaAi/meta_ai_open.py
-import os
-import time
-import psutil
+import sys
 import threading
-import json
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 
-class MetaAiBrowserNode:
+from .meta_ai_browser_pool import META_AI_MEDIA_URL
+from .meta_ai_cdp import read_devtools_port, register_endpoint, unregister_endpoint
+from .meta_ai_metrics import JobTrace
+from .meta_ai_shells import MetaAiBrowserNodeShell
+
+class MetaAiBrowserNode(MetaAiBrowserNodeShell):
     def __init__(self):
         self.active = True
         self.browser_thread = None
         self.browser_running = False
 
-    @classmethod
-    def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "activate": ("BOOLEAN", {"default": True}),
-                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),
-            }
-        }
-
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("profile_path",)
-    FUNCTION = "launch_browser"
-    CATEGORY = "MetaAI"
-
     def launch_browser(self, activate, profile_name="meta_playwright_profile3"):
         if not activate:
             return (f"Browser deactivated by switch",)
@@ -53,69 +41,58 @@ class MetaAiBrowserNode:
     def _run_browser(self, user_data_dir):
         """
         Función que encapsula la lógica de apertura del navegador con Playwright.
+
+        El navegador expone un puerto de depuración (CDP) que se anota en el
+        registro de meta_ai_cdp: mientras siga abierto, los generadores que
+        usen este perfil abren sus pestañas en él en lugar de lanzar otro.
         """
+        trace = JobTrace("browser_session", profile=Path(user_data_dir).name)
         try:
             with sync_playwright() as p:
-                context = p.chromium.launch_persistent_context(
-                    user_data_dir,
-                    headless=False, # Siempre False para que el usuario pueda interactuar
-                    args=[
-                        "--start-fullscreen", # O "--start-maximized" si fullscreen no es deseado
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=TranslateUI",
-                        "--no-first-run",
-                        "--no-default-browser-check",
-                    ],
-                    viewport=None, # Permite usar toda la pantalla
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
-                )
+                # Chromium lo reescribe con el puerto real; uno viejo confundiría la lectura
+                (Path(user_data_dir) / "DevToolsActivePort").unlink(missing_ok=True)
+                with trace.span("launch"):
+                    context = p.chromium.launch_persistent_context(
+                        user_data_dir,
+                        headless=False, # Siempre False para que el usuario pueda interactuar
+                        args=[
+                            "--start-fullscreen", # O "--start-maximized" si fullscreen no es deseado
+                            "--disable-blink-features=AutomationControlled",
+                            "--disable-features=TranslateUI",
+                            "--no-first-run",
+                            "--no-default-browser-check",
+                            "--remote-debugging-port=0", # Puerto libre elegido por Chromium
+                        ],
+                        viewport=None, # Permite usar toda la pantalla
+                        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+                    )
 
-                page = context.pages[0] if context.pages else context.new_page()
-                print("Navegando a Meta AI...")
-                page.goto("https://www.meta.ai/media", timeout=60000)
-                print("Pagina de Meta AI cargada. Cierra la ventana manualmente para salir.")
+                port = read_devtools_port(user_data_dir)
+                if port is not None:
+                    register_endpoint(user_data_dir, f"http://127.0.0.1:{port}")
+                    print(f"[INFO] Navegador disponible para los generadores en el puerto CDP {port}")
+                else:
+                    print("[WARN] No se pudo leer el puerto CDP; los generadores lanzarán su propio navegador", file=sys.stderr)
 
-                # === Obtener PID de Chrome ===
                 try:
-                    # Intenta obtener el PID directamente desde el contexto de Playwright
-                    pid = context._impl_obj._browser_process.pid
-                except Exception:
-                    # Si falla, intenta encontrarlo usando psutil
-                    current_pid = os.getpid()
-                    parent = psutil.Process(current_pid)
-                    children = parent.children(recursive=True)
-                    chrome_procs = [c for c in children if 'chrome' in c.name().lower()]
-                    pid = chrome_procs[-1].pid if chrome_procs else None
+                    page = context.pages[0] if context.pages else context.new_page()
+                    print("Navegando a Meta AI...")
+                    with trace.span("goto"):
+                        page.goto(META_AI_MEDIA_URL, timeout=60000)
+                    print("Pagina de Meta AI cargada. Cierra la ventana manualmente para salir.")
 
-                if pid is None:
-                    print("No se pudo obtener el PID de Chrome.")
-                    context.close()
-                    self.browser_running = False
-                    return
-
-                # === Mantener el hilo vivo mientras Chrome esté abierto ===
-                def is_chrome_running():
-                    try:
-                        # Verifica si el proceso con el PID existe y está corriendo
-                        return psutil.pid_exists(pid) and psutil.Process(pid).is_running()
-                    except psutil.NoSuchProcess:
-                        # Si el proceso no existe, asume que no está corriendo
-                        return False
-
-                print(f"Monitoreando el proceso de Chrome (PID: {pid})...")
-                while is_chrome_running():
-                    # Espera un breve periodo antes de verificar nuevamente
-                    time.sleep(0.5)
+                    # === Mantener el hilo vivo hasta que se cierre el navegador ===
+                    with trace.span("session"):
+                        context.wait_for_event("close", timeout=0)
+                finally:
+                    unregister_endpoint(user_data_dir)
 
                 print("Ventana de Chrome cerrada. Finalizando script.")
-                # El navegador ya debería estar cerrado, pero asegurémonos
-                try:
-                    context.close()
-                except:
-                    pass # Puede que ya esté cerrado
+            trace.finish()
 
         except Exception as e:
             # Imprimir el mensaje de error sin emojis en stderr
             print(f"Error al abrir Meta AI: {e}", file=sys.stderr)
+            trace.finish(JobTrace.classify(e), e)
         
-        self.browser_running = False
\ No newline at end of file
+        self.browser_running = False
@@ -0,0 +1,15 @@
+# ComfyUI_MetaAi/meta_ai_options.py
+# Listas de opciones compartidas por los nodos. Sin dependencias: se importa
+# al registrar los nodos en el arranque de ComfyUI.
+
+BROWSER_MODES = ["visible", "offscreen", "headless"]
+
+# Recursos que la generación no necesita (separados por comas en los nodos)
+DEFAULT_BLOCKED_HOSTS = "google-analytics.com,googletagmanager.com,doubleclick.net,connect.facebook.net"
+
+CLEANUP_POLICIES = ["per_job", "every_n", "on_idle", "off"]
+
+PROFILE_STRATEGIES = ["round_robin", "least_loaded"]
+
+# Presets de meta_ai_ffmpeg para los videos generados
+TRANSCODE_PRESETS = ["none", "h264_web", "h264_small", "vp9_webm", "prores_edit"]
@@ -0,0 +1,229 @@
+# ComfyUI_MetaAi/meta_ai_profiles.py
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+GOLDEN_DIR = Path(__file__).parent / "meta_ai_profiles"
+
+# Lo único que hace falta para conservar la sesión (Local State guarda la clave de las cookies)
+SESSION_FILES = [
+    "Local State",
+    "Default/Preferences",
+    "Default/Cookies",
+    "Default/Network/Cookies",
+]
+SESSION_DIRS = ["Default/Local Storage"]
+COOKIE_FILES = ["Default/Network/Cookies", "Default/Cookies"]
+MARKER = "meta_ai_golden.json"
+
+
+def _ram_root():
+    """Directorio en RAM para los clones (tmpfs en Linux); si no hay, el temporal del sistema."""
+    configured = os.environ.get("META_AI_PROFILE_TMP")
+    if configured:
+        return Path(configured)
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return Path(tempfile.gettempdir())
+
+
+def _pid_alive(pid):
+    """True si el proceso `pid` sigue vivo (o no se puede saber)."""
+    if os.name == "nt":
+        # En Windows os.kill(pid, 0) terminaría el proceso: se consulta con la API de Win32
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: existe pero es de otro usuario
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _copy_file(src, dst):
+    """Copia atómica; las bases SQLite se copian con la API de backup (consistentes aunque estén abiertas)."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    if src.name == "Cookies":
+        try:
+            source = sqlite3.connect(f"file:{src}?mode=ro", uri=True, timeout=5)
+            target = sqlite3.connect(tmp)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp, dst)
+            return
+        except sqlite3.Error:
+            tmp.unlink(missing_ok=True)
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _copy_dir(src, dst):
+    tmp = dst.with_name(dst.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    # LOCK es el bloqueo de leveldb del navegador que la tiene abierta
+    shutil.copytree(src, tmp, ignore=shutil.ignore_patterns("LOCK"))
+    shutil.rmtree(dst, ignore_errors=True)
+    os.replace(tmp, dst)
+
+
+def copy_session(src_dir, dst_dir):
+    """Copia cookies, Local Storage y Local State de un perfil a otro. Devuelve lo copiado."""
+    copied = []
+    for name in SESSION_FILES:
+        src = Path(src_dir) / name
+        if src.is_file():
+            _copy_file(src, Path(dst_dir) / name)
+            copied.append(name)
+    for name in SESSION_DIRS:
+        src = Path(src_dir) / name
+        if src.is_dir():
+            _copy_dir(src, Path(dst_dir) / name)
+            copied.append(name)
+    return copied
+
+
+def _cookies_mtime(profile_dir):
+    for name in COOKIE_FILES:
+        path = Path(profile_dir) / name
+        if path.is_file():
+            return path.stat().st_mtime
+    return 0.0
+
+
+class ProfileManager:
+    """
+    Clones ligeros de un perfil con sesión iniciada para varios navegadores a la vez.
+
+    De cada perfil se guarda una copia "golden" recortada (solo cookies, Local
+    Storage y Local State, sin cachés) que se refresca cuando el perfil
+    original tiene cookies más nuevas (p. ej. tras iniciar sesión con
+    MetaAiBrowserNode). Cada trabajador recibe un clon de esa copia en un
+    directorio en RAM: arranca más rápido que el perfil completo y, al no
+    compartir el bloqueo de Chromium, varios pueden usar la misma cuenta. Al
+    cerrar un clon, su sesión (cookies renovadas) vuelve a la copia golden.
+    """
+
+    def __init__(self, golden_root=GOLDEN_DIR, ram_root=None):
+        self.golden_root = Path(golden_root)
+        self.clone_root = Path(ram_root or _ram_root()) / "meta_ai_profiles" / str(os.getpid())
+        self._lock = threading.Lock()
+        self._clones = {}  # clon -> perfil original
+        self._remove_stale()
+
+    def _remove_stale(self):
+        # Clones de procesos anteriores que no llegaron a cerrarse; los de otro ComfyUI
+        # (o un benchmark) aún en marcha tienen Chromium abierto encima y no se tocan
+        parent = self.clone_root.parent
+        if not parent.is_dir():
+            return
+        for path in parent.iterdir():
+            if path == self.clone_root or not path.name.isdigit():
+                continue
+            if not _pid_alive(int(path.name)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def golden_dir(self, profile_dir):
+        return self.golden_root / Path(profile_dir).name
+
+    def is_clone(self, user_data_dir):
+        with self._lock:
+            return str(Path(user_data_dir).resolve()) in self._clones
+
+    def refresh_golden(self, profile_dir):
+        """Actualiza la copia golden si el perfil original tiene una sesión más reciente."""
+        golden = self.golden_dir(profile_dir)
+        marker_path = golden / MARKER
+        try:
+            marker = json.loads(marker_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            marker = {}
+        source_mtime = _cookies_mtime(profile_dir)
+        if source_mtime <= marker.get("source_mtime", 0.0):
+            return golden
+        try:
+            copied = copy_session(profile_dir, golden)
+        except OSError as e:
+            # En Windows las cookies de un navegador abierto están bloqueadas
+            print(f"[WARN] No se pudo actualizar la copia golden de {Path(profile_dir).name}: {e}", file=sys.stderr)
+            return golden
+        if not any(name in copied for name in COOKIE_FILES):
+            print(f"[WARN] El perfil {Path(profile_dir).name} no tiene cookies; ¿se inició sesión con MetaAiBrowserNode?", file=sys.stderr)
+        marker.update(source_mtime=source_mtime, refreshed=time.time())
+        marker_path.write_text(json.dumps(marker), encoding="utf-8")
+        print(f"[INFO] Copia golden de {Path(profile_dir).name} actualizada ({', '.join(copied)})")
+        return golden
+
+    def expand(self, profile_dirs, clones):
+        """
+        Sustituye cada perfil por `clones` directorios de trabajo clonados de su
+        copia golden. Los clones se reutilizan mientras sigan registrados.
+        """
+        workers = []
+        for profile_dir in profile_dirs:
+            with self._lock:
+                golden = self.refresh_golden(profile_dir)
+                for i in range(clones):
+                    clone = self.clone_root / f"{Path(profile_dir).name}-w{i}"
+                    key = str(clone.resolve())
+                    if key not in self._clones:
+                        shutil.rmtree(clone, ignore_errors=True)
+                        clone.mkdir(parents=True)
+                        if golden.is_dir():
+                            copy_session(golden, clone)
+                        self._clones[key] = str(profile_dir)
+                    workers.append(clone)
+        return workers
+
+    def release(self, user_data_dir):
+        """
+        Devuelve la sesión de un clon (ya cerrado) a su copia golden y lo borra.
+        Gana la última sesión guardada: las cookies más nuevas sustituyen a las anteriores.
+        """
+        key = str(Path(user_data_dir).resolve())
+        with self._lock:
+            profile_dir = self._clones.pop(key, None)
+            if profile_dir is None:
+                return
+            golden = self.golden_dir(profile_dir)
+            try:
+                if _cookies_mtime(user_data_dir) > _cookies_mtime(golden):
+                    copy_session(user_data_dir, golden)
+            except OSError as e:
+                print(f"[WARN] No se pudo guardar la sesión del clon {Path(user_data_dir).name}: {e}", file=sys.stderr)
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+_profile_manager = None
+_profile_manager_lock = threading.Lock()
+
+
+def get_profile_manager():
+    """Devuelve el gestor de clones de perfil compartido del proceso."""
+    global _profile_manager
+    with _profile_manager_lock:
+        if _profile_manager is None:
+            _profile_manager = ProfileManager()
+        return _profile_manager
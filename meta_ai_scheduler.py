@@ -0,0 +1,329 @@
+# ComfyUI_MetaAi/meta_ai_scheduler.py
+import re
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+
+async def run_bounded(items, worker, concurrency):
+    """
+    Ejecuta `await worker(item)` para cada elemento con como máximo `concurrency`
+    trabajos en paralelo. Devuelve los resultados en el orden de entrada; un
+    trabajo que falla aporta su excepción en lugar del resultado.
+    """
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def guarded(item):
+        async with semaphore:
+            try:
+                return await worker(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return e
+
+    return await asyncio.gather(*(guarded(item) for item in items))
+
+
+# Textos que delatan que Meta AI está limitando la cuenta (palabras completas)
+THROTTLE_MARKERS = re.compile(
+    r"\b(rate[ -]?limit(ed)?|too many requests|quota|try again later|limit reached|429)\b"
+)
+_URL = re.compile(r"\S+://\S+")
+
+
+def is_throttled(error):
+    """True si el error parece un límite de uso de la cuenta y no un fallo puntual."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    # Las URLs (p. ej. de fbcdn) pueden contener "429" u otros marcadores por casualidad
+    text = _URL.sub(" ", str(error).lower())
+    return THROTTLE_MARKERS.search(text) is not None
+
+
+def profile_dirs(profile_names, base_dir, default="meta_playwright_profile3"):
+    """
+    Convierte `profile_name` (uno o varios nombres separados por comas o
+    saltos de línea) en la lista de directorios de perfil, creándolos.
+    """
+    names = [name.strip() for name in profile_names.replace("\n", ",").split(",") if name.strip()]
+    dirs = []
+    for name in names or [default]:
+        user_data_dir = Path(base_dir) / name
+        user_data_dir.mkdir(parents=True, exist_ok=True)
+        if user_data_dir not in dirs:
+            dirs.append(user_data_dir)
+    return dirs
+
+
+class TokenBucket:
+    """Cubo de fichas: `rate_per_minute` trabajos por minuto con ráfagas de hasta `burst` (0 = sin límite)."""
+
+    def __init__(self, rate_per_minute=0.0, burst=1):
+        self.configure(rate_per_minute, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def configure(self, rate_per_minute, burst=1):
+        self.rate = max(0.0, float(rate_per_minute)) / 60.0
+        self.burst = max(1, int(burst))
+
+    def try_take(self, now):
+        """Toma una ficha si hay; si no, devuelve los segundos hasta la siguiente."""
+        if self.rate <= 0:
+            return True, 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class AimdController:
+    """
+    Control AIMD (aumento aditivo, reducción multiplicativa) de la concurrencia
+    y de la separación entre arranques de un perfil.
+
+    Cada éxito suma 1/límite al límite (≈ +1 por cada "ventana" de trabajos
+    correctos) y acorta la separación. Un fallo o timeout multiplica el límite
+    por `decrease` y alarga la separación; una señal de límite de uso lo baja
+    al mínimo. Un éxito mucho más lento que la media (`latency_factor`) cuenta
+    como congestión leve. Las reducciones se aplican como mucho una vez por
+    tiempo medio de trabajo, para no castigar varias veces la misma ráfaga.
+    """
+
+    def __init__(self, ceiling=1, floor=1, decrease=0.5, latency_factor=2.0, max_gap=60.0):
+        self.ceiling = max(floor, ceiling)
+        self.floor = floor
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.max_gap = max_gap
+        self.limit = float(self.ceiling)
+        self.gap = 0.0
+        self.latency = None
+        self._last_decrease = 0.0
+
+    @property
+    def allowed(self):
+        """Trabajos simultáneos permitidos ahora."""
+        return max(self.floor, min(self.ceiling, int(self.limit)))
+
+    def set_ceiling(self, ceiling):
+        self.ceiling = max(self.floor, int(ceiling))
+        self.limit = min(self.limit, float(self.ceiling))
+
+    def on_success(self, seconds):
+        if self.latency is not None and seconds > self.latency_factor * self.latency:
+            self._reduce(seconds, (1 + self.decrease) / 2, 1.0)
+        else:
+            self.limit = min(float(self.ceiling), self.limit + 1.0 / max(1.0, self.limit))
+            self.gap = self.gap * 0.5 if self.gap > 0.5 else 0.0
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+    def on_failure(self, throttled):
+        if throttled:
+            self._reduce(None, 0.0, 10.0)
+        else:
+            self._reduce(None, self.decrease, 2.0)
+
+    def _reduce(self, seconds, factor, min_gap):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 10.0) / 2:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.floor), self.limit * factor)
+        self.gap = min(self.max_gap, max(min_gap, self.gap * 2))
+
+
+class _ProfileState:
+    def __init__(self, user_data_dir):
+        self.user_data_dir = user_data_dir
+        self.max_concurrency = 1
+        self.adaptive = True
+        self.aimd = AimdController()
+        self.bucket = TokenBucket()
+        self.active = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.last_started = 0.0
+        self.stats = {"jobs": 0, "ok": 0, "failed": 0, "throttled": 0, "ejected": 0}
+
+
+class ProfileScheduler:
+    """
+    Reparte trabajos entre varios perfiles (una cuenta de Meta AI por perfil).
+
+    Cada perfil tiene su límite de trabajos simultáneos y su cubo de fichas.
+    La elección es "round_robin" o "least_loaded" (menor ocupación relativa).
+    Un perfil con `eject_after` fallos seguidos, o con una señal de límite de
+    uso, queda fuera durante `eject_seconds` (el doble en cada expulsión
+    consecutiva, hasta `max_eject_seconds`) y después vuelve a recibir
+    trabajos; nunca se expulsa al único perfil disponible. Un éxito le
+    devuelve el historial limpio. Con `adaptive`, un AimdController ajusta
+    por debajo del límite configurado cuántos trabajos corren a la vez y
+    cuánto se separan sus arranques.
+
+    El estado se protege con un threading.Lock: los nodos de cada ejecución
+    de ComfyUI corren en su propio event loop.
+    """
+
+    def __init__(self, eject_after=3, eject_seconds=120.0, max_eject_seconds=1800.0, poll_interval=0.25):
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._states = {}
+        self._next = 0
+
+    def configure(self, user_data_dirs, max_concurrency=1, rate_per_minute=0.0, burst=1, adaptive=True):
+        """Aplica los límites a los perfiles indicados (se crean si no existían)."""
+        with self._lock:
+            for state in self._get_states(user_data_dirs):
+                state.max_concurrency = max(1, int(max_concurrency))
+                state.adaptive = bool(adaptive)
+                state.aimd.set_ceiling(state.max_concurrency)
+                state.bucket.configure(rate_per_minute, burst)
+
+    def report(self):
+        """Estadísticas por perfil."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                Path(key).name: dict(
+                    state.stats, active=state.active,
+                    limit=state.aimd.allowed if state.adaptive else state.max_concurrency,
+                    start_gap=round(state.aimd.gap, 2) if state.adaptive else 0.0,
+                    ejected_for=round(max(0.0, state.ejected_until - now), 1)
+                )
+                for key, state in self._states.items()
+            }
+
+    async def run(self, user_data_dirs, job, strategy="round_robin", accept=None):
+        """
+        Ejecuta `await job(user_data_dir)` en el perfil elegido y devuelve su resultado.
+        `accept(result)` permite contar como fallo un resultado vacío (p. ej. un timeout silencioso).
+        """
+        state = await self._acquire(user_data_dirs, strategy)
+        started = time.monotonic()
+        try:
+            result = await job(state.user_data_dir)
+        except asyncio.CancelledError:
+            with self._lock:
+                state.active -= 1
+            raise
+        except Exception as e:
+            self._release(state, e, time.monotonic() - started, user_data_dirs)
+            raise
+        error = None if accept is None or accept(result) else RuntimeError("resultado vacío")
+        self._release(state, error, time.monotonic() - started, user_data_dirs)
+        return result
+
+    def _get_states(self, user_data_dirs):
+        states = []
+        for user_data_dir in user_data_dirs:
+            key = str(Path(user_data_dir).resolve())
+            state = self._states.get(key)
+            if state is None:
+                state = _ProfileState(Path(user_data_dir))
+                self._states[key] = state
+            states.append(state)
+        return states
+
+    async def _acquire(self, user_data_dirs, strategy):
+        while True:
+            with self._lock:
+                state, wait = self._pick(self._get_states(user_data_dirs), strategy, time.monotonic())
+                if state is not None:
+                    state.active += 1
+                    state.stats["jobs"] += 1
+                    state.last_started = time.monotonic()
+                    return state
+            await asyncio.sleep(min(max(wait, 0.01), self.poll_interval * 4))
+
+    def _pick(self, states, strategy, now):
+        """Devuelve (perfil, 0) o (None, segundos a esperar antes de reintentar)."""
+        if strategy == "least_loaded":
+            order = sorted(states, key=lambda s: (s.active / s.max_concurrency, s.last_started))
+        else:
+            start = self._next % len(states)
+            order = states[start:] + states[:start]
+
+        wait = self.poll_interval
+        waits = []
+        for state in order:
+            if state.ejected_until > now:
+                waits.append(state.ejected_until - now)
+                continue
+            if state.ejected_until:
+                state.ejected_until = 0.0
+                print(f"[INFO] Perfil {state.user_data_dir.name} readmitido tras su expulsión")
+            if state.active >= (state.aimd.allowed if state.adaptive else state.max_concurrency):
+                continue
+            if state.adaptive and state.aimd.gap and now - state.last_started < state.aimd.gap:
+                # Separación mínima entre arranques tras fallos recientes
+                waits.append(state.aimd.gap - (now - state.last_started))
+                continue
+            taken, token_wait = state.bucket.try_take(now)
+            if not taken:
+                waits.append(token_wait)
+                continue
+            if strategy != "least_loaded":
+                self._next = states.index(state) + 1
+            return state, 0.0
+        if waits:
+            wait = min(wait, min(waits))
+        return None, wait
+
+    def _release(self, state, error, seconds, user_data_dirs=()):
+        with self._lock:
+            state.active -= 1
+            if error is None:
+                state.failures = 0
+                state.ejections = 0
+                state.stats["ok"] += 1
+                state.aimd.on_success(seconds)
+                return
+            state.failures += 1
+            state.stats["failed"] += 1
+            throttled = is_throttled(error)
+            if throttled:
+                state.stats["throttled"] += 1
+            state.aimd.on_failure(throttled)
+            if state.ejected_until > time.monotonic():
+                # Trabajo lanzado antes de la expulsión: no la alarga
+                return
+            if not (throttled or state.failures >= self.eject_after):
+                return
+            now = time.monotonic()
+            others = [s for s in self._get_states(user_data_dirs) if s is not state and s.ejected_until <= now]
+            if not others:
+                # Sin otro perfil disponible, expulsarlo solo pararía la cola: el AIMD ya lo frena
+                state.failures = 0
+                print(f"[WARN] Perfil {state.user_data_dir.name} falla ({error}), pero es el único disponible", file=sys.stderr)
+                return
+            state.ejections += 1
+            state.failures = 0
+            state.stats["ejected"] += 1
+            seconds = min(self.max_eject_seconds, self.eject_seconds * 2 ** (state.ejections - 1))
+            state.ejected_until = now + seconds
+            reason = "límite de uso" if throttled else "fallos consecutivos"
+            print(f"[WARN] Perfil {state.user_data_dir.name} expulsado {seconds:.0f}s ({reason}): {error}", file=sys.stderr)
+
+
+_profile_scheduler = None
+_profile_scheduler_lock = threading.Lock()
+
+
+def get_profile_scheduler():
+    """Devuelve el planificador de perfiles compartido del proceso."""
+    global _profile_scheduler
+    with _profile_scheduler_lock:
+        if _profile_scheduler is None:
+            _profile_scheduler = ProfileScheduler()
+        return _profile_scheduler
@@ -0,0 +1,232 @@
+# ComfyUI_MetaAi/meta_ai_shells.py
+import sys
+import importlib
+
+from .meta_ai_options import (
+    BROWSER_MODES, DEFAULT_BLOCKED_HOSTS, CLEANUP_POLICIES, PROFILE_STRATEGIES, TRANSCODE_PRESETS,
+)
+
+
+class _LazyNode:
+    """
+    Clase ligera que se registra en ComfyUI en lugar del nodo real.
+
+    Solo declara las entradas y salidas (sin importar Playwright, torch, cv2...);
+    la implementación, que hereda de esta clase, se importa y se instancia en
+    la primera ejecución del nodo.
+    """
+
+    IMPL_MODULE = None
+    IMPL_CLASS = None
+
+    def _impl(self):
+        impl = self.__dict__.get("_impl_instance")
+        if impl is None:
+            module = importlib.import_module(f".{self.IMPL_MODULE}", __package__)
+            impl = getattr(module, self.IMPL_CLASS)()
+            self._impl_instance = impl
+        return impl
+
+
+class MetaAiImageGeneratorShell(_LazyNode):
+    IMPL_MODULE = "meta_ai_t2i_nodes"
+    IMPL_CLASS = "MetaAiImageGenerator"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "prompt": ("STRING", {"multiline": True, "default": ""}),
+                "timeout": ("INT", {"default": 120, "min": 10, "max": 300}),
+                "aspect_ratio": (["1:1", "16:9", "9:16"], {"default": "1:1"}),
+                "force_generation": ("BOOLEAN", {"default": False}),  # Añadido parámetro para forzar generación
+            },
+            "optional": {
+                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),  # Uno o varios separados por comas
+                "batch_mode": ("BOOLEAN", {"default": False}),  # Una generación por cada línea del prompt
+                "max_concurrency": ("INT", {"default": 2, "min": 1, "max": 8}),  # Pestañas en paralelo en modo batch
+                "size_policy": (["resize", "pad"], {"default": "resize"}),  # Cómo unir imágenes de distinto tamaño
+                "retention_keep_last": ("INT", {"default": 0, "min": 0, "max": 100000}),  # 0 = sin límite
+                "retention_max_age_days": ("INT", {"default": 0, "min": 0, "max": 3650}),  # 0 = sin límite
+                "retention_max_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 10000.0, "step": 0.5}),  # 0 = sin límite
+                "chat_cleanup": (CLEANUP_POLICIES, {"default": "per_job"}),  # Cuándo borrar los chats en segundo plano
+                "cleanup_every_n": ("INT", {"default": 5, "min": 1, "max": 1000}),  # Para la política every_n
+                "browser_mode": (BROWSER_MODES, {"default": "visible"}),  # headless/offscreen para equipos sin pantalla
+                "block_resources": ("BOOLEAN", {"default": False}),  # Bloquear tipos de recurso y dominios de telemetría
+                "blocked_resource_types": ("STRING", {"default": ""}),  # p. ej. "font,media"; desactiva la caché HTTP
+                "blocked_hosts": ("STRING", {"default": DEFAULT_BLOCKED_HOSTS}),
+                "profile_strategy": (PROFILE_STRATEGIES, {"default": "round_robin"}),  # Con varios perfiles en profile_name
+                "profile_concurrency": ("INT", {"default": 2, "min": 1, "max": 8}),  # Trabajos simultáneos por perfil
+                "profile_rate_per_min": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 600.0, "step": 0.5}),  # 0 = sin límite
+                "adaptive_concurrency": ("BOOLEAN", {"default": True}),  # AIMD por debajo de profile_concurrency
+                "profile_clones": ("INT", {"default": 0, "min": 0, "max": 8}),  # Clones en RAM por perfil (0 = usar el perfil)
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "INT")
+    RETURN_NAMES = ("preview_images", "prompt_index")
+    OUTPUT_IS_LIST = (False, True)
+    FUNCTION = "generate_images"
+    CATEGORY = "MetaAI"
+
+    async def generate_images(self, **kwargs):
+        return await self._impl().generate_images(**kwargs)
+
+
+class MetaAiSingleVideoGeneratorShell(_LazyNode):
+    IMPL_MODULE = "meta_ai_i2v_single"
+    IMPL_CLASS = "MetaAiSingleVideoGenerator"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),  # Entrada de imagen de ComfyUI
+                "prompt": ("STRING", {"multiline": True, "default": ""}),
+                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),  # Uno o varios separados por comas
+                "namevideo": ("STRING", {"default": ""}),
+                "force_generation": ("BOOLEAN", {"default": False}),  # Para forzar generación
+            },
+            "optional": {
+                "batch_pairing": (["single", "zip", "cartesian"], {"default": "single"}),
+                "max_concurrency": ("INT", {"default": 2, "min": 1, "max": 8}),  # Pestañas en paralelo
+                "upload_format": (["png_fast", "jpeg", "webp"], {"default": "png_fast"}),  # Codificación de la imagen subida
+                "upload_quality": ("INT", {"default": 92, "min": 50, "max": 100}),  # Calidad JPEG/WebP
+                "return_frames": ("BOOLEAN", {"default": False}),  # Decodificar el video a frames IMAGE
+                "frame_stride": ("INT", {"default": 1, "min": 1, "max": 64}),  # Conservar 1 de cada N frames
+                "max_frames": ("INT", {"default": 0, "min": 0, "max": 10000}),  # 0 = sin límite
+                "frame_width": ("INT", {"default": 0, "min": 0, "max": 8192}),  # 0 = original; con una sola se mantiene la proporción
+                "frame_height": ("INT", {"default": 0, "min": 0, "max": 8192}),
+                "frames_mmap": ("BOOLEAN", {"default": False}),  # Buffer de frames en archivo mapeado
+                "retention_keep_last": ("INT", {"default": 0, "min": 0, "max": 100000}),  # 0 = sin límite
+                "retention_max_age_days": ("INT", {"default": 0, "min": 0, "max": 3650}),  # 0 = sin límite
+                "retention_max_gb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 10000.0, "step": 0.5}),  # 0 = sin límite
+                "chat_cleanup": (CLEANUP_POLICIES, {"default": "per_job"}),  # Cuándo borrar los chats en segundo plano
+                "cleanup_every_n": ("INT", {"default": 5, "min": 1, "max": 1000}),  # Para la política every_n
+                "browser_mode": (BROWSER_MODES, {"default": "visible"}),  # headless/offscreen para equipos sin pantalla
+                "block_resources": ("BOOLEAN", {"default": False}),  # Bloquear tipos de recurso y dominios de telemetría
+                "blocked_resource_types": ("STRING", {"default": ""}),  # p. ej. "font,media"; desactiva la caché HTTP
+                "blocked_hosts": ("STRING", {"default": DEFAULT_BLOCKED_HOSTS}),
+                "profile_strategy": (PROFILE_STRATEGIES, {"default": "round_robin"}),  # Con varios perfiles en profile_name
+                "profile_concurrency": ("INT", {"default": 2, "min": 1, "max": 8}),  # Trabajos simultáneos por perfil
+                "profile_rate_per_min": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 600.0, "step": 0.5}),  # 0 = sin límite
+                "adaptive_concurrency": ("BOOLEAN", {"default": True}),  # AIMD por debajo de profile_concurrency
+                "profile_clones": ("INT", {"default": 0, "min": 0, "max": 8}),  # Clones en RAM por perfil (0 = usar el perfil)
+                "faststart": ("BOOLEAN", {"default": False}),  # Remux sin recodificar con moov al principio (ffmpeg)
+                "thumbnail": ("BOOLEAN", {"default": False}),  # Miniatura .jpg junto al video
+                "preview": ("BOOLEAN", {"default": False}),  # Vista previa animada _preview.webp
+                "transcode_preset": (TRANSCODE_PRESETS, {"default": "none"}),  # Copia recodificada además del original
+                "concat_batch": ("BOOLEAN", {"default": False}),  # Unir los videos del batch en uno (al final de la lista)
+            }
+        }
+
+    RETURN_TYPES = ("VIDEO", "IMAGE")
+    RETURN_NAMES = ("video_path", "frames")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "generate_video"
+    CATEGORY = "MetaAI"
+
+    async def generate_video(self, **kwargs):
+        return await self._impl().generate_video(**kwargs)
+
+
+class MetaAiBrowserNodeShell(_LazyNode):
+    IMPL_MODULE = "meta_ai_open"
+    IMPL_CLASS = "MetaAiBrowserNode"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "activate": ("BOOLEAN", {"default": True}),
+                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("profile_path",)
+    FUNCTION = "launch_browser"
+    CATEGORY = "MetaAI"
+
+    def launch_browser(self, **kwargs):
+        return self._impl().launch_browser(**kwargs)
+
+
+class MetaAiSubmitShell(_LazyNode):
+    IMPL_MODULE = "meta_ai_jobs"
+    IMPL_CLASS = "MetaAiSubmit"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "kind": (["image", "video"], {"default": "image"}),
+                "prompt": ("STRING", {"multiline": True, "default": ""}),
+                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),  # Uno o varios separados por comas
+                "force_generation": ("BOOLEAN", {"default": False}),
+            },
+            "optional": {
+                "image": ("IMAGE",),  # Obligatoria para video
+                "aspect_ratio": (["1:1", "16:9", "9:16"], {"default": "1:1"}),
+                "timeout": ("INT", {"default": 120, "min": 10, "max": 300}),
+                "batch_mode": ("BOOLEAN", {"default": False}),
+                "max_concurrency": ("INT", {"default": 2, "min": 1, "max": 8}),
+                "namevideo": ("STRING", {"default": ""}),
+                "batch_pairing": (["single", "zip", "cartesian"], {"default": "single"}),
+                "return_frames": ("BOOLEAN", {"default": False}),
+                "browser_mode": (BROWSER_MODES, {"default": "visible"}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("job_id",)
+    FUNCTION = "submit"
+    CATEGORY = "MetaAI"
+
+    # Nodo -> [época, último job_id]; la época solo avanza cuando ese trabajo ya no existe
+    _handles = {}
+
+    @classmethod
+    def IS_CHANGED(cls, unique_id=None, **kwargs):
+        # Con las mismas entradas se reutiliza el job_id en caché de ComfyUI mientras el gestor
+        # lo conserve; si lo olvidó (keep_seconds, forget o reinicio) el nodo vuelve a encolar
+        handle = cls._handles.setdefault(unique_id, [0, None])
+        jobs = sys.modules.get(f"{__package__}.{cls.IMPL_MODULE}")
+        if handle[1] is None or jobs is None or jobs.get_job_manager().get(handle[1]) is None:
+            handle[0] += 1
+            handle[1] = None
+        return handle[0]
+
+    async def submit(self, **kwargs):
+        return await self._impl().submit(**kwargs)
+
+
+class MetaAiCollectShell(_LazyNode):
+    IMPL_MODULE = "meta_ai_jobs"
+    IMPL_CLASS = "MetaAiCollect"
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "job_id": ("STRING", {"default": ""}),  # Conectar desde Submit o pegar el id de otra ejecución
+                "mode": (["wait", "poll"], {"default": "wait"}),
+                "timeout": ("INT", {"default": 600, "min": 1, "max": 3600}),  # Espera máxima en modo wait
+                "forget": ("BOOLEAN", {"default": False}),  # Liberar el trabajo al recogerlo (si no, a la hora)
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "VIDEO", "IMAGE", "STRING")
+    RETURN_NAMES = ("images", "video_path", "frames", "status")
+    OUTPUT_IS_LIST = (False, True, True, False)
+    FUNCTION = "collect"
+    CATEGORY = "MetaAI"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # El estado del trabajo cambia aunque las entradas no
+        return float("nan")
+
+    async def collect(self, **kwargs):
+        return await self._impl().collect(**kwargs)
@@ -6,276 +6,330 @@ import json
 from pathlib import Path
 import asyncio
 import torch
-from PIL import Image
 
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-class MetaAiImageGenerator:
+from .meta_ai_browser_pool import get_browser_pool, BrowserOptions, META_AI_MEDIA_URL
+from .meta_ai_profiles import get_profile_manager
+from .meta_ai_scheduler import run_bounded, profile_dirs, get_profile_scheduler
+from .meta_ai_cache import get_result_cache, get_single_flight
+from .meta_ai_capture import MediaCapture
+from .meta_ai_download import get_downloader
+from .meta_ai_dom import DomHarvester
+from .meta_ai_watcher import PageWatcher
+from .meta_ai_media import decode_image_batch
+from .meta_ai_catalog import get_catalog
+from .meta_ai_janitor import get_chat_janitor
+from .meta_ai_metrics import JobTrace
+from .meta_ai_options import DEFAULT_BLOCKED_HOSTS
+from .meta_ai_shells import MetaAiImageGeneratorShell
+
+class MetaAiImageGenerator(MetaAiImageGeneratorShell):
     def __init__(self):
         # Directorio de salida en la carpeta principal de ComfyUI
         self.output_dir = Path(__file__).parent.parent.parent / "output" / "meta_ai_image"
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    @classmethod
-    def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "prompt": ("STRING", {"multiline": True, "default": ""}),
-                "timeout": ("INT", {"default": 120, "min": 10, "max": 300}),
-                "aspect_ratio": (["1:1", "16:9", "9:16"], {"default": "1:1"}),
-                "force_generation": ("BOOLEAN", {"default": False}),  # Añadido parámetro para forzar generación
-            },
-            "optional": {
-                "profile_name": ("STRING", {"default": "meta_playwright_profile3"}),
-            }
-        }
-
-    RETURN_TYPES = ("IMAGE",)
-    RETURN_NAMES = ("preview_images",)
-    FUNCTION = "generate_images"
-    CATEGORY = "MetaAI"
-
-    async def generate_images(self, prompt, timeout, aspect_ratio, force_generation, profile_name="meta_playwright_profile3"):
+    async def generate_images(self, prompt, timeout, aspect_ratio, force_generation, profile_name="meta_playwright_profile3",
+                              batch_mode=False, max_concurrency=2, size_policy="resize",
+                              retention_keep_last=0, retention_max_age_days=0, retention_max_gb=0.0,
+                              chat_cleanup="per_job", cleanup_every_n=5,
+                              browser_mode="visible", block_resources=False, blocked_resource_types="",
+                              blocked_hosts=DEFAULT_BLOCKED_HOSTS, profile_strategy="round_robin",
+                              profile_concurrency=2, profile_rate_per_min=0.0, adaptive_concurrency=True,
+                              profile_clones=0):
         """
-        Genera imágenes usando Meta AI y devuelve las imágenes como tensor
+        Genera imágenes usando Meta AI y devuelve las imágenes como tensor.
+        En modo batch cada línea del prompt es un trabajo independiente y se
+        reparten entre varias pestañas; con varios perfiles en profile_name
+        (una cuenta cada uno) los trabajos se reparten también entre cuentas.
+        size_policy decide si las imágenes de otro tamaño se redimensionan al
+        de la primera o se rellenan con negro hasta el tamaño máximo.
         """
         # Aseguramos que el nombre del perfil no esté vacío
         profile_name = profile_name.strip() or "meta_playwright_profile3"
 
-        full_prompt = "Create Image: " + prompt.strip()
-        
-        # Directorio fijo para el perfil (dentro del directorio del nodo)
-        user_data_dir = Path(__file__).parent / profile_name
-        user_data_dir.mkdir(parents=True, exist_ok=True)
+        if batch_mode:
+            prompts = [line.strip() for line in prompt.split("\n") if line.strip()]
+        else:
+            prompts = [prompt.strip()]
 
-        downloaded_paths = []
+        # Directorios fijos de los perfiles (dentro del directorio del nodo)
+        user_data_dirs = profile_dirs(profile_name, Path(__file__).parent)
+        if profile_clones:
+            # Varios navegadores por cuenta: clones ligeros del perfil con la sesión iniciada
+            user_data_dirs = get_profile_manager().expand(user_data_dirs, profile_clones)
+        profiles = get_profile_scheduler()
+        profiles.configure(user_data_dirs, profile_concurrency, profile_rate_per_min, adaptive=adaptive_concurrency)
 
-        try:
-            async with async_playwright() as p:
-                context = await p.chromium.launch_persistent_context(
-                    str(user_data_dir),
-                    headless=False,
-                    locale="en-US",
-                    args=[
-                        "--start-maximized",
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=TranslateUI,msUnifiedAppUIToolbar",
-                        "--no-first-run",
-                        "--no-default-browser-check",
-                        "--disable-background-timer-throttling",
-                        "--disable-renderer-backgrounding",
-                        "--disable-features=CalculateNativeWinOcclusion",
-                        "--disable-infobars",
-                        "--disable-session-crashed-bubble",
-                        "--lang=en-US"
-                    ],
-                    viewport=None,
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36",
-                    accept_downloads=True,
-                    ignore_default_args=["--enable-automation"],
-                    timeout=30000
+        pool = get_browser_pool()
+        browser_options = BrowserOptions.from_inputs(browser_mode, block_resources, blocked_resource_types, blocked_hosts)
+        cache = get_result_cache()
+        single_flight = get_single_flight()
+        catalog = get_catalog()
+        catalog.set_retention(
+            self.output_dir, max_bytes=int(retention_max_gb * 1024 ** 3),
+            max_age=retention_max_age_days * 86400, keep_last=retention_keep_last
+        )
+        # Imágenes de esta ejecución que la retención no debe borrar hasta decodificarlas
+        held = []
+
+        async def run_prompt(single_prompt):
+            trace = JobTrace("image", profile=profile_name, mode=browser_mode, aspect_ratio=aspect_ratio)
+            try:
+                generated = await generate_one(single_prompt, trace)
+            except Exception as e:
+                trace.finish(JobTrace.classify(e), e)
+                raise
+            trace.finish("ok" if generated else "error", None if generated else "sin imágenes")
+            return generated
+
+        async def generate_one(single_prompt, trace):
+            started = time.monotonic()
+            cache_key = cache.make_key("image", single_prompt, {"aspect_ratio": aspect_ratio})
+            if not force_generation:
+                with trace.span("cache_lookup"):
+                    cached_paths = cache.get(cache_key)
+                if cached_paths:
+                    trace.labels["cache_hit"] = True
+                    print(f"[INFO] Imágenes recuperadas de la caché: {single_prompt[:60]}")
+                    return cached_paths
+                # Un prompt idéntico que ya se está generando se comparte en lugar de repetirse
+                generated, shared = await single_flight.run(
+                    cache_key, lambda: produce_one(single_prompt, cache_key, trace, started)
                 )
+                if shared:
+                    trace.labels["coalesced"] = True
+                    print(f"[INFO] Imágenes compartidas con una generación idéntica en curso: {single_prompt[:60]}")
+                return generated
+            return await produce_one(single_prompt, cache_key, trace, started)
 
-                page = context.pages[0] if context.pages else await context.new_page()
-                await page.goto("https://www.meta.ai/media", timeout=60000)
+        async def produce_one(single_prompt, cache_key, trace, started):
+            full_prompt = "Create Image: " + single_prompt
 
-                # --- Seleccionar aspect ratio ---
-                try:
-                    current_ratio_element = page.locator(f'div[aria-label="{aspect_ratio}"]')
-                    current_ratio_count = await current_ratio_element.count()
-                    if current_ratio_count:
-                        svg_elements = current_ratio_element.locator('svg:not([fill="none"])')
-                        is_selected = await svg_elements.count() > 0
-                        if not is_selected:
-                            await current_ratio_element.click(force=True)
-                            await page.wait_for_timeout(1000)
-                            option = page.locator(f'text={aspect_ratio}')
-                            await option.wait_for(state="visible", timeout=5000)
-                            await option.click(force=True)
-                    else:
-                        fallback_ratios = ["1:1", "16:9", "9:16", "4:3", "3:4"]
-                        for r in fallback_ratios:
-                            btn = page.locator(f'div[aria-label="{r}"]')
-                            btn_count = await btn.count()
-                            if btn_count and await btn.is_visible():
-                                await btn.click(force=True)
-                                await page.wait_for_timeout(500)
-                                target = page.locator(f'text={aspect_ratio}')
-                                target_count = await target.count()
-                                if target_count:
-                                    await target.click(force=True)
-                                    break
-                except Exception as e:
-                    print(f"[WARN] Aspect ratio '{aspect_ratio}': {e}", file=sys.stderr)
+            async def on_profile(user_data_dir):
+                trace.labels["profile"] = user_data_dir.name
+                # El navegador queda abierto en el pool para los siguientes elementos de la cola
+                generated = await pool.run(
+                    user_data_dir, self._generate_on_page, full_prompt, timeout, aspect_ratio, force_generation,
+                    browser_options=browser_options, trace=trace, job_trace=trace
+                )
+                # Los chats se borran después, en segundo plano
+                get_chat_janitor().job_finished(user_data_dir, chat_cleanup, cleanup_every_n)
+                return generated
 
-                # --- Rellenar prompt ---
-                try:
-                    selector_input = 'div[role="textbox"][contenteditable="true"]'
-                    await page.wait_for_selector(selector_input, state="visible", timeout=30000)
-                    await page.click(selector_input)
+            # Sin imágenes (timeout silencioso) cuenta como fallo del perfil
+            generated = await profiles.run(user_data_dirs, on_profile, profile_strategy, accept=bool)
+
+            timings = dict(trace.spans, total_s=time.monotonic() - started)
+            for path, _ in generated:
+                catalog.record(path, "image", single_prompt, {"aspect_ratio": aspect_ratio}, cache_key, timings,
+                               in_use=True)
+                held.append(path)
+
+            # Solo se guardan resultados completos; un timeout parcial se reintenta la próxima vez
+            if len(generated) >= 4:
+                cache.put(cache_key, [path for path, _ in generated[:4]])
+            # Las imágenes capturadas se decodifican desde memoria sin releer el archivo
+            return [content if content is not None else path for path, content in generated]
+
+        batch_trace = JobTrace("image_batch", profile=profile_name, prompts=len(prompts))
+        try:
+            with batch_trace.span("jobs"):
+                results = await run_bounded(prompts, run_prompt, max_concurrency if batch_mode else 1)
+
+            # Reunir las imágenes en el orden de los prompts
+            sources = []
+            source_index = []
+            for index, result in enumerate(results):
+                if isinstance(result, Exception):
+                    print(f"[ERROR] Prompt {index}: {result}", file=sys.stderr)
+                    continue
+                for source in result[:4]:  # Solo las primeras 4 imágenes de cada prompt
+                    sources.append(source)
+                    source_index.append(index)
+
+            # Decodificar todo a un único tensor de batch
+            with batch_trace.span("tensor_conversion"):
+                preview_images_tensor, loaded = decode_image_batch(sources, size_policy)
+        finally:
+            catalog.release(held)
+        if preview_images_tensor is None:
+            batch_trace.finish("error", "sin imágenes")
+            # Si no hay imágenes, crear un tensor vacío (por ejemplo, una imagen negra 512x512)
+            return (torch.zeros((1, 512, 512, 3), dtype=torch.float32), [-1])
+
+        batch_trace.finish()
+        return (preview_images_tensor, [source_index[i] for i in loaded])
+
+    async def _generate_on_page(self, page, full_prompt, timeout, aspect_ratio, force_generation, job_trace=None):
+        """
+        Ejecuta una generación completa en una pestaña del pool. Devuelve una lista
+        de (ruta, bytes) donde bytes son los capturados de la página o None.
+        """
+        trace = job_trace or JobTrace("image")
+        # Las imágenes que carga la página se guardan al vuelo para no descargarlas otra vez
+        async with MediaCapture(page, ("image/",)) as capture:
+            return await self._run_generation(page, capture, trace, full_prompt, timeout, aspect_ratio, force_generation)
+
+    async def _run_generation(self, page, capture, trace, full_prompt, timeout, aspect_ratio, force_generation):
+        downloaded = []
+        # Número de trabajo reservado en el catálogo: trabajos paralelos nunca comparten nombre
+        job_base = get_catalog().allocate_name(self.output_dir, "meta_ai_image", digits=5).name
+        with trace.span("goto"):
+            await page.goto(META_AI_MEDIA_URL, timeout=60000)
+
+        # --- Seleccionar aspect ratio ---
+        with trace.span("aspect_ratio"):
+            await self._select_aspect_ratio(page, aspect_ratio)
+
+        # --- Rellenar prompt ---
+        with trace.span("prompt"):
+            await self._enter_prompt(page, capture, full_prompt, force_generation)
+
+        # --- Esperar y descargar imágenes ---
+        if not full_prompt:
+            # modo manual: solo esperar
+            await page.wait_for_timeout(timeout * 1000)
+            return downloaded
+
+        try:
+            # Esperar a que aparezcan las imágenes generadas
+            # Un MutationObserver en la página avisa en cuanto existen los 4 botones "Download media"
+            with trace.span("wait_generation"):
+                await PageWatcher(page).wait_for("images_ready", timeout, 4)
+
+            with trace.span("download"):
+                downloaded = await self._save_images(page, capture, job_base)
+        except PlaywrightTimeoutError:
+            trace.mark("timeout")
+            print("[WARN] Timeout: no se generaron 4 imágenes a tiempo", file=sys.stderr)
+
+        return downloaded
+
+    async def _select_aspect_ratio(self, page, aspect_ratio):
+        try:
+            # Estado de todos los botones de aspect ratio en una sola consulta
+            dom = DomHarvester(page)
+            state = await dom.harvest()
+            current = state["ratios"].get(aspect_ratio)
+            if current:
+                if not current["selected"]:
+                    await page.locator(f'div[aria-label="{aspect_ratio}"]').click(force=True)
                     await page.wait_for_timeout(1000)
+                    option = page.locator(f'text={aspect_ratio}')
+                    await option.wait_for(state="visible", timeout=5000)
+                    await option.click(force=True)
+            else:
+                # El botón que abrió el menú la última vez se prueba primero
+                tried = []
+                winner = None
+                for r in dom.ratio_openers(state, aspect_ratio):
+                    tried.append(r)
+                    await page.locator(f'div[aria-label="{r}"]').click(force=True)
+                    await page.wait_for_timeout(500)
+                    target = page.locator(f'text={aspect_ratio}')
+                    target_count = await target.count()
+                    if target_count:
+                        await target.click(force=True)
+                        winner = r
+                        break
+                dom.record_ratio_opener(aspect_ratio, winner, tried)
+        except Exception as e:
+            print(f"[WARN] Aspect ratio '{aspect_ratio}': {e}", file=sys.stderr)
 
-                    if full_prompt:
-                        await page.keyboard.insert_text(full_prompt)
-                        await page.wait_for_timeout(500)
-                        
-                        # Forzar generación si está habilitado
-                        if force_generation:
-                            # Agregar un carácter único temporal al prompt y luego borrarlo
-                            # para forzar la actualización
-                            await page.keyboard.insert_text(" ")
-                            await page.wait_for_timeout(100)
-                            await page.keyboard.press("Backspace")
-                        
-                        await page.keyboard.press("Enter")
-                except PlaywrightTimeoutError:
-                    print("[WARN] Campo de prompt no encontrado a tiempo", file=sys.stderr)
-
-                # --- Esperar y descargar imágenes ---
-                if full_prompt:
-                    try:
-                        # Esperar a que aparezcan las imágenes generadas
-                        await page.wait_for_function(
-                            "() => document.querySelectorAll('div[aria-label=\"Download media\"]').length >= 4",
-                            timeout=timeout * 1000
-                        )
-                        
-                        # Buscar imágenes generadas directamente en el DOM
-                        image_selectors = [
-                            'img[alt="Media generated by meta.ai"]',
-                            'div[aria-label="Download media"] img',
-                            'img[src*="scontent.feze8-2.fna.fbcdn.net"]'
-                        ]
-                        
-                        for selector in image_selectors:
-                            images = await page.query_selector_all(selector)
-                            print(f"[DEBUG] Encontradas {len(images)} imágenes con selector: {selector}")
-                            if len(images) >= 4:
-                                break
-                        
-                        # Si no encontramos imágenes con download buttons, intentamos capturarlas directamente
-                        if len(images) == 0:
-                            # Esperar un poco más y luego capturar imágenes visibles
-                            await page.wait_for_timeout(5000)
-                            images = await page.query_selector_all('img[alt="Media generated by meta.ai"]')
-                        
-                        print(f"[DEBUG] Total imágenes encontradas: {len(images)}")
-                        
-                        for i, img in enumerate(images[:4], 1):
-                            try:
-                                # Obtener la URL de la imagen
-                                img_src = await img.get_attribute('src')
-                                if img_src:
-                                    print(f"[DEBUG] Imagen {i} src: {img_src[:100]}...")
-                                    
-                                    # Descargar imagen directamente desde la URL
-                                    import requests
-                                    response = requests.get(img_src)
-                                    if response.status_code == 200:
-                                        safe_name = f"meta_ai_image_{i}_{int(time.time())}.jpeg"
-                                        save_path = self.output_dir / safe_name
-                                        with open(save_path, 'wb') as f:
-                                            f.write(response.content)
-                                        downloaded_paths.append(str(save_path.resolve()))
-                                        print(f"[DEBUG] Imagen {i} descargada a: {save_path}")
-                                    else:
-                                        print(f"[WARN] No se pudo descargar imagen {i} desde {img_src}")
-                                else:
-                                    print(f"[WARN] Imagen {i} no tiene src")
-                            except Exception as e:
-                                print(f"[WARN] Error descargando imagen {i}: {e}")
-                        
-                        # Si aún no se descargaron imágenes, intentar con los botones de descarga
-                        if len(downloaded_paths) == 0:
-                            buttons = await page.query_selector_all('div[aria-label="Download media"]')
-                            print(f"[DEBUG] Encontrados {len(buttons)} botones de descarga")
-                            
-                            for i, btn in enumerate(buttons[:4], 1):
-                                try:
-                                    with page.expect_download() as download_info:
-                                        await btn.click(timeout=5000)
-                                    download = await download_info.value
-                                    safe_name = f"meta_ai_image_{i}_{int(time.time())}_{await download.suggested_filename()}"
-                                    save_path = self.output_dir / safe_name
-                                    await download.save_as(str(save_path))
-                                    downloaded_paths.append(str(save_path.resolve()))
-                                    print(f"[DEBUG] Imagen {i} descargada vía botón: {save_path}")
-                                except Exception as e:
-                                    print(f"[WARN] Imagen {i} no descargada vía botón: {e}")
-
-                        # --- Eliminar chat ---
-                        try:
-                            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                            await page.wait_for_timeout(1000)
-
-                            menu_btn = page.locator('div[aria-label*="More options"]').last
-                            if await menu_btn.is_visible():
-                                await menu_btn.click(force=True)
-                                await page.wait_for_timeout(1000)
-
-                                delete_opt = page.locator('div[role="menuitem"]:has-text("Delete chat")').first
-                                if not await delete_opt.is_visible():
-                                    delete_opt = page.locator('text="Delete chat"').first
-                                if await delete_opt.is_visible():
-                                    await delete_opt.click(force=True)
-                                    await page.wait_for_timeout(1000)
-
-                                    confirm = page.locator('div[aria-label="Delete"]').first
-                                    if not await confirm.is_visible():
-                                        confirm = page.locator('span:text-is("Delete")').last
-                                    if await confirm.is_visible():
-                                        await confirm.click(force=True)
-                        except Exception as e:
-                            print(f"[WARN] Limpieza de chat fallida (no crítico): {e}", file=sys.stderr)
-
-                    except PlaywrightTimeoutError:
-                        print("[WARN] Timeout: no se generaron 4 imágenes a tiempo", file=sys.stderr)
+    async def _enter_prompt(self, page, capture, full_prompt, force_generation):
+        try:
+            selector_input = 'div[role="textbox"][contenteditable="true"]'
+            await page.wait_for_selector(selector_input, state="visible", timeout=30000)
+            await page.click(selector_input)
+            await page.wait_for_timeout(1000)
 
-                else:
-                    # modo manual: solo esperar
-                    await page.wait_for_timeout(timeout * 1000)
+            if full_prompt:
+                await page.keyboard.insert_text(full_prompt)
+                await page.wait_for_timeout(500)
 
-                # Cerrar el navegador al finalizar el proceso
-                print("Cerrando navegador...")
-                try:
-                    await context.close()
-                except Exception as e:
-                    print(f"[WARN] Error al cerrar contexto: {e}", file=sys.stderr)
-
-                # Convertir las imágenes descargadas a tensores de ComfyUI
-                preview_images = []
-                for img_path in downloaded_paths[:4]:  # Solo las primeras 4 imágenes
-                    try:
-                        # Cargar la imagen con PIL
-                        pil_image = Image.open(img_path).convert("RGB")
-                        # Convertir a tensor
-                        image_tensor = torch.from_numpy(
-                            (np.array(pil_image) / 255.0).astype(np.float32)
-                        ).unsqueeze(0)  # Agregar dimensión batch
-                        preview_images.append(image_tensor)
-                    except Exception as e:
-                        print(f"[WARN] Error cargando imagen {img_path}: {e}")
-                
-                # Concatenar todos los tensores en un solo tensor de batch
-                if preview_images:
-                    preview_images_tensor = torch.cat(preview_images, dim=0)
+                # Forzar generación si está habilitado
+                if force_generation:
+                    # Agregar un carácter único temporal al prompt y luego borrarlo
+                    # para forzar la actualización
+                    await page.keyboard.insert_text(" ")
+                    await page.wait_for_timeout(100)
+                    await page.keyboard.press("Backspace")
+
+                capture.arm()
+                await page.keyboard.press("Enter")
+        except PlaywrightTimeoutError:
+            print("[WARN] Campo de prompt no encontrado a tiempo", file=sys.stderr)
+
+    async def _save_images(self, page, capture, job_base):
+        """Guarda las 4 imágenes generadas y devuelve [(ruta, bytes|None)]."""
+        downloaded = []
+        # Buscar imágenes generadas directamente en el DOM: todas las estrategias
+        # y sus src en un solo page.evaluate, la que funcionó la última vez primero
+        dom = DomHarvester(page)
+        image_srcs = await dom.image_sources(4)
+
+        # Si no encontramos imágenes con download buttons, intentamos capturarlas directamente
+        if len(image_srcs) == 0:
+            # Esperar un poco más y luego capturar imágenes visibles
+            await page.wait_for_timeout(5000)
+            image_srcs = await dom.image_sources(4)
+
+        print(f"[DEBUG] Total imágenes encontradas: {len(image_srcs)}")
+
+        # Primero los bytes que el navegador ya recibió; el resto se descarga en paralelo
+        slots = []
+        pending = []
+        for i, img_src in enumerate(image_srcs[:4], 1):
+            try:
+                print(f"[DEBUG] Imagen {i} src: {img_src[:100]}...")
+
+                safe_name = f"{job_base}_{i}.jpeg"
+                save_path = self.output_dir / safe_name
+                content = await capture.take(img_src)
+                if content is not None:
+                    with open(save_path, 'wb') as f:
+                        f.write(content)
                 else:
-                    # Si no hay imágenes, crear un tensor vacío (por ejemplo, una imagen negra 512x512)
-                    preview_images_tensor = torch.zeros((1, 512, 512, 3), dtype=torch.float32)
+                    pending.append((img_src, save_path))
+                slots.append((i, img_src, save_path, content))
+            except Exception as e:
+                print(f"[WARN] Error descargando imagen {i}: {e}")
 
-                return (preview_images_tensor,)
+        failed = set()
+        if pending:
+            results = await get_downloader().download_many(pending)
+            for (img_src, _), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    print(f"[WARN] No se pudo descargar imagen desde {img_src[:100]}: {result}")
+                    failed.add(img_src)
 
-        except Exception as e:
-            print(f"[ERROR] {e}", file=sys.stderr)
-            # Devolver tensor vacío en caso de error para que el nodo no falle completamente
-            return (torch.zeros((1, 512, 512, 3), dtype=torch.float32),)
+        for i, img_src, save_path, content in slots:
+            if img_src not in failed:
+                downloaded.append((str(save_path.resolve()), content))
+                print(f"[DEBUG] Imagen {i} descargada a: {save_path}")
 
+        # Si aún no se descargaron imágenes, intentar con los botones de descarga
+        if len(downloaded) == 0:
+            buttons = await page.query_selector_all('div[aria-label="Download media"]')
+            print(f"[DEBUG] Encontrados {len(buttons)} botones de descarga")
+
+            for i, btn in enumerate(buttons[:4], 1):
+                try:
+                    async with page.expect_download() as download_info:
+                        await btn.click(timeout=5000)
+                    download = await download_info.value
+                    safe_name = f"{job_base}_{i}_{download.suggested_filename}"
+                    save_path = self.output_dir / safe_name
+                    await download.save_as(str(save_path))
+                    downloaded.append((str(save_path.resolve()), None))
+                    print(f"[DEBUG] Imagen {i} descargada vía botón: {save_path}")
+                except Exception as e:
+                    print(f"[WARN] Imagen {i} no descargada vía botón: {e}")
+
+        return downloaded
 
-# Importar numpy si no está disponible
-try:
-    import numpy as np
-except ImportError:
-    import numpy as np
 
 # Registro del nodo
 NODE_CLASS_MAPPINGS = {
@@ -284,4 +338,4 @@ NODE_CLASS_MAPPINGS = {
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "MetaAiImageGenerator": "Meta AI Image Generator"
-}
\ No newline at end of file
+}
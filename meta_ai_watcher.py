@@ -0,0 +1,133 @@
+# ComfyUI_MetaAi/meta_ai_watcher.py
+import asyncio
+import weakref
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+BINDING_NAME = "__metaAiNotify"
+
+# Observador en la página: cada condición armada se evalúa en cada mutación del
+# DOM y, en cuanto se cumple, se notifica a Python una sola vez vía la binding.
+# Vive en el `window` del documento: tras una navegación hay que volver a armarlo.
+_INSTALL_JS = """
+if (!window.__metaAiWatcher) {
+    const OVERLAY = 'div[style*="--x-backdropFilter: blur"]';
+    const videoSrcs = () => Array.from(document.querySelectorAll('video'))
+        .map(v => (v.getAttribute('src') || '').trim())
+        .filter(s => s.startsWith('http') && !s.includes('blob:'));
+    const conditions = {
+        animate_enabled: () => {
+            const btn = Array.from(document.querySelectorAll('div[role="button"]'))
+                .find(e => (e.textContent || '').includes('Animate'));
+            return !!btn && btn.getAttribute('tabindex') === '0' && btn.getAttribute('aria-disabled') !== 'true';
+        },
+        images_ready: (state) =>
+            document.querySelectorAll('div[aria-label="Download media"]').length >= (state.arg || 4),
+        video_url: (state) => {
+            if (document.querySelector(OVERLAY)) return null;
+            return videoSrcs().find(s => !state.initial.has(s)) || null;
+        },
+    };
+    const armed = new Map();
+    const check = () => {
+        for (const [name, state] of Array.from(armed)) {
+            let value = null;
+            try { value = conditions[name](state); } catch (e) {}
+            if (value) {
+                armed.delete(name);
+                window.__metaAiNotify(name, value);
+            }
+        }
+    };
+    new MutationObserver(check).observe(document.documentElement, {
+        subtree: true, childList: true, attributes: true,
+        attributeFilter: ['tabindex', 'aria-disabled', 'src', 'style', 'aria-label'],
+    });
+    window.__metaAiWatcher = {
+        arm(name, arg, initial) {
+            const state = { arg, initial: new Set(initial || videoSrcs()) };
+            armed.set(name, state);
+            check();
+            return Array.from(state.initial);
+        },
+        disarm(name) { armed.delete(name); },
+    };
+}
+"""
+
+_ARM_JS = "([name, arg, initial]) => {" + _INSTALL_JS + "return window.__metaAiWatcher.arm(name, arg, initial); }"
+_DISARM_JS = "(name) => window.__metaAiWatcher && window.__metaAiWatcher.disarm(name)"
+
+# Futuros pendientes por pestaña; la binding solo se expone una vez por página
+_page_waiters = weakref.WeakKeyDictionary()
+
+
+class PageWatcher:
+    """
+    Espera eventos de la página sin sondeo.
+
+    Condiciones disponibles: "animate_enabled", "images_ready" (arg = número
+    mínimo de botones "Download media") y "video_url" (devuelve la URL http de
+    un video nuevo, solo cuando el overlay de generación ya no está).
+
+    Si la pestaña carga otro documento (navegación o recarga) mientras se
+    espera, la condición se vuelve a armar en él; los videos que ya había al
+    armarla por primera vez siguen sin contar como nuevos.
+    """
+
+    def __init__(self, page):
+        self.page = page
+
+    async def _ensure_binding(self):
+        waiters = _page_waiters.get(self.page)
+        if waiters is None:
+            waiters = {}
+            _page_waiters[self.page] = waiters
+
+            def notify(_source, name, value):
+                future = waiters.pop(name, None)
+                if future is not None and not future.done():
+                    future.set_result(value)
+
+            await self.page.expose_binding(BINDING_NAME, notify)
+        return waiters
+
+    async def wait_for(self, name, timeout, arg=None):
+        """Devuelve el valor de la condición en cuanto se cumple; PlaywrightTimeoutError si no."""
+        waiters = await self._ensure_binding()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiters[name] = future
+        armed = {"initial": None}
+
+        async def arm(first=False):
+            try:
+                initial = await self.page.evaluate(_ARM_JS, [name, arg, armed["initial"]])
+            except Exception:
+                if first and self.page.is_closed():
+                    raise
+                # Documento destruido a mitad (navegación): se arma al cargar el siguiente
+                return
+            if armed["initial"] is None:
+                armed["initial"] = initial
+
+        def on_document(_page):
+            # El observador y lo armado se pierden con el documento anterior
+            if not future.done():
+                loop.create_task(arm())
+
+        # Antes del primer armado, para no perder una navegación que ocurra mientras tanto
+        self.page.on("domcontentloaded", on_document)
+        try:
+            await arm(first=True)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            try:
+                await self.page.evaluate(_DISARM_JS, name)
+            except Exception:
+                pass
+            raise PlaywrightTimeoutError(f"Timeout esperando '{name}' ({timeout}s)")
+        finally:
+            self.page.remove_listener("domcontentloaded", on_document)
+            if waiters.get(name) is future:
+                del waiters[name]